@@ -1,9 +1,50 @@
 import streamlit as st
 import os
-from rfp_analyzer import RFPAnalyzer
+import shutil
+import atexit
+import tempfile
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from rfp_analyzer import RFPAnalyzer, QA_ERROR_ANSWER, CACHE_DIR
+from qa_cache import QACache
 from datetime import datetime
 import json
 
+# 업로드 파일을 임시 파일로 복사할 때의 버퍼 크기 (1 MiB)
+UPLOAD_COPY_BUFFER_SIZE = 1 << 20
+
+# 업로드 임시 파일 위치 (가능하면 RAM 기반 tmpfs 사용)
+TEMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# 백그라운드에서 생성 중인 제안서 초안을 화면에 반영하는 간격 (초)
+DRAFT_POLL_INTERVAL = 0.2
+
+# 질의응답 예시 질문
+EXAMPLE_QUESTIONS = [
+    "이 RFP의 주요 목적은 무엇인가요?",
+    "프로젝트 일정은 어떻게 되어 있나요?",
+    "예산 범위는 얼마인가요?"
+]
+
+# 세션 상태 기본값 (가변 객체는 세션마다 새로 만들도록 생성 함수로 지정)
+_SESSION_DEFAULTS = {
+    "analyzer": None,
+    "analysis_result": None,
+    "similar_rfps": list,
+    "qa_question": "",
+    "qa_answer": "",
+    "qa_cache": QACache,
+    "analysis_by_hash": dict,
+    "draft_future": None,
+    "draft_parts": list,
+    "draft_usage": dict,
+    "draft_warnings": list,
+    "proposal_draft": ""
+}
+
 # Streamlit 설정
 st.set_page_config(
     page_title="RFP 분석 시스템",
@@ -12,6 +53,161 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource(show_spinner=False)
+def _load_env():
+    """.env 파일 로드 (rerun마다 스크립트가 다시 실행되므로 st.cache_resource로 한 번만 실행)"""
+    load_dotenv()
+    return True
+
+@st.cache_resource(show_spinner=False)
+def build_analyzer(search_endpoint, search_key, search_index_name, openai_endpoint, openai_key, openai_api_version):
+    """설정값별로 RFPAnalyzer 하나만 생성해 재사용 (클라이언트 연결 풀 유지)"""
+    return RFPAnalyzer(
+        search_endpoint=search_endpoint,
+        search_key=search_key,
+        search_index_name=search_index_name,
+        openai_endpoint=openai_endpoint,
+        openai_key=openai_key,
+        openai_api_version=openai_api_version
+    )
+
+@st.cache_resource
+def _background_executor():
+    """백그라운드 작업(검색 인덱싱, 제안서 생성 등)용 스레드 풀 (모든 세션이 공유)"""
+    return ThreadPoolExecutor(max_workers=8)
+
+class _EmptySearchResult(Exception):
+    """빈 검색 결과 (st.cache_data는 예외를 캐시하지 않음)"""
+
+@st.cache_data(ttl=300, max_entries=256, show_spinner=False)
+def _cached_search(_analyzer, search_endpoint, index_name, search_query):
+    """유사 RFP 검색 결과 캐시 (analyzer는 해시 대상에서 제외하고 엔드포인트/인덱스로 구분)
+    
+    검색 오류도 빈 목록으로 돌아오므로, 빈 결과는 예외로 빠져나가 캐시되지 않게 합니다.
+    """
+    similar_rfps = _analyzer.search_similar_rfps([search_query])
+    if not similar_rfps:
+        raise _EmptySearchResult()
+    return similar_rfps
+
+def _search_similar_rfps(analyzer, search_query):
+    """유사 RFP 검색 (결과가 있을 때만 캐시 사용)"""
+    try:
+        return _cached_search(analyzer, analyzer._search_endpoint, analyzer.index_name, search_query)
+    except _EmptySearchResult:
+        return []
+
+def _store_rfp(analyzer, *args, **kwargs):
+    """RFP를 검색 인덱스에 저장하고, 성공하면 새 RFP가 검색되도록 검색 결과 캐시를 비움 (백그라운드 스레드에서 실행)
+    
+    백그라운드 스레드에서는 st.error/st.warning이 표시되지 않으므로 저장 오류는 예외로 전달하고,
+    (저장 성공 여부, 경고 목록)을 반환해 화면 스레드에서 표시합니다.
+    """
+    warnings = []
+    stored = analyzer.store_rfp_in_search(*args, warnings=warnings, raise_errors=True, **kwargs)
+    if stored:
+        _cached_search.clear()
+    return stored, warnings
+
+def _cleanup_temp_dirs(temp_dirs):
+    for temp_dir in list(temp_dirs):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+@st.cache_resource
+def _pending_temp_dirs():
+    """아직 삭제되지 않은 업로드 임시 디렉터리 (비정상 종료 대비 프로세스 종료 시 정리)"""
+    temp_dirs = set()
+    atexit.register(_cleanup_temp_dirs, temp_dirs)
+    return temp_dirs
+
+def _remove_temp_dir(temp_dir):
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    _pending_temp_dirs().discard(temp_dir)
+
+async def _analyze_and_prefetch(analyzer, rfp_content, pdf_title):
+    """GPT 분석, 유사 RFP 검색, 본문 임베딩을 동시에 실행"""
+    return await asyncio.gather(
+        analyzer.analyze_rfp_with_gpt_async(rfp_content),
+        analyzer.search_similar_rfps_async([pdf_title]),
+        analyzer.get_embedding_async(rfp_content)
+    )
+
+def _analysis_cache_path(file_hash):
+    return os.path.join(CACHE_DIR, f"{file_hash}.json")
+
+def _load_cached_analysis(file_hash):
+    """파일 해시로 이전 분석 결과 조회 (세션 → 디스크 순, 없으면 None)
+    
+    (분석 결과, 본문, 제목, 유사 RFP 목록)을 반환하며, 유사 RFP 목록이 없는 이전 캐시 파일은 유사 RFP 목록이 None입니다.
+    """
+    cached = st.session_state.analysis_by_hash.get(file_hash)
+    if cached:
+        return cached
+    
+    try:
+        with open(_analysis_cache_path(file_hash), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        cached = (data["analysis_result"], data["rfp_content"], data["pdf_title"], data.get("similar_rfps"))
+    except (OSError, ValueError, KeyError):
+        return None
+    
+    st.session_state.analysis_by_hash[file_hash] = cached
+    return cached
+
+def _save_cached_analysis(file_hash, analysis_result, rfp_content, pdf_title, similar_rfps):
+    """분석 결과를 파일 해시로 저장 (프로세스 재시작 후에도 재사용, 분석 당시의 유사 RFP 목록 포함)"""
+    st.session_state.analysis_by_hash[file_hash] = (analysis_result, rfp_content, pdf_title, similar_rfps)
+    
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        cache_path = _analysis_cache_path(file_hash)
+        with open(cache_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "analysis_result": analysis_result,
+                "rfp_content": rfp_content,
+                "pdf_title": pdf_title,
+                "similar_rfps": similar_rfps
+            }, f, ensure_ascii=False)
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError as e:
+        st.warning(f"⚠️ 분석 결과 캐시 저장 실패: {str(e)}")
+
+def _question_embedding(analyzer, question):
+    """질문 임베딩 조회 (예시 질문은 초기화 때 계산해 둔 벡터 사용)"""
+    example_embeddings = st.session_state.get("example_embeddings")
+    if example_embeddings is not None and question in EXAMPLE_QUESTIONS:
+        return example_embeddings[EXAMPLE_QUESTIONS.index(question)]
+    return analyzer.get_question_embedding(question)
+
+def _uploaded_title(analyzer, uploaded_file):
+    """업로드 파일 제목 (같은 파일은 한 번만 추출)"""
+    cached = st.session_state.get("upload_title")
+    if cached and cached[0] == uploaded_file.file_id:
+        return cached[1]
+    
+    title = analyzer.extract_title(uploaded_file, uploaded_file.name)
+    st.session_state.upload_title = (uploaded_file.file_id, title)
+    return title
+
+def _collect_stream(stream, parts):
+    """스트리밍 응답 조각을 parts에 모으고 전체 문자열 반환 (백그라운드 스레드에서 실행)"""
+    for delta in stream:
+        parts.append(delta)
+    return "".join(parts)
+
+def _set_question(question):
+    """예시 질문 버튼 콜백: 질문 입력란 채우기"""
+    st.session_state.qa_question = question
+
+def _reset_question():
+    """질문 초기화 버튼 콜백"""
+    st.session_state.qa_question = ""
+    st.session_state.qa_answer = ""
+
+def _is_cacheable(answer):
+    """오류 안내 문구로 끝난 답변은 캐시하지 않음"""
+    return bool(answer) and not answer.endswith(QA_ERROR_ANSWER)
+
 def main():
     st.title("📋 RFP 분석 시스템")
     st.markdown("---")
@@ -20,24 +216,27 @@ def main():
     with st.sidebar:
         st.header("⚙️ 서비스 설정")
         
-        # 환경변수 로드
-        from dotenv import load_dotenv
-        load_dotenv()
+        # 환경변수 로드 (프로세스당 한 번)
+        _load_env()
         
-        # Azure AI Search 설정
-        search_endpoint = st.text_input("Azure AI Search 엔드포인트", value=os.getenv("AZURE_SEARCH_ENDPOINT", ""))
-        search_key = st.text_input("Azure AI Search 키", value=os.getenv("AZURE_SEARCH_KEY", ""), type="password")
-        search_index_name = st.text_input("검색 인덱스명", value=os.getenv("AZURE_SEARCH_INDEX_NAME", "rfp-index"))
+        # 설정 입력은 폼으로 묶어 제출 시에만 rerun
+        with st.form("config", clear_on_submit=False):
+            # Azure AI Search 설정
+            search_endpoint = st.text_input("Azure AI Search 엔드포인트", value=os.getenv("AZURE_SEARCH_ENDPOINT", ""))
+            search_key = st.text_input("Azure AI Search 키", value=os.getenv("AZURE_SEARCH_KEY", ""), type="password")
+            search_index_name = st.text_input("검색 인덱스명", value=os.getenv("AZURE_SEARCH_INDEX_NAME", "rfp-index"))
         
-        # Azure OpenAI 설정
-        openai_endpoint = st.text_input("Azure OpenAI 엔드포인트", value=os.getenv("AZURE_OPENAI_ENDPOINT", ""))
-        openai_key = st.text_input("Azure OpenAI 키", value=os.getenv("AZURE_OPENAI_KEY", ""), type="password")
-        openai_api_version = st.text_input("API 버전", value=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"))
+            # Azure OpenAI 설정
+            openai_endpoint = st.text_input("Azure OpenAI 엔드포인트", value=os.getenv("AZURE_OPENAI_ENDPOINT", ""))
+            openai_key = st.text_input("Azure OpenAI 키", value=os.getenv("AZURE_OPENAI_KEY", ""), type="password")
+            openai_api_version = st.text_input("API 버전", value=os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"))
+        
+            submitted = st.form_submit_button("🔧 서비스 초기화")
         
         # 분석기 초기화
-        if st.button("🔧 서비스 초기화"):
+        if submitted:
             try:
-                st.session_state.analyzer = RFPAnalyzer(
+                st.session_state.analyzer = build_analyzer(
                     search_endpoint=search_endpoint,
                     search_key=search_key,
                     search_index_name=search_index_name,
@@ -45,23 +244,16 @@ def main():
                     openai_key=openai_key,
                     openai_api_version=openai_api_version
                 )
+                # 예시 질문 임베딩을 한 번의 요청으로 미리 계산
+                st.session_state.example_embeddings = st.session_state.analyzer.embed_texts(EXAMPLE_QUESTIONS)
                 st.success("✅ 서비스가 초기화되었습니다!")
             except Exception as e:
                 st.error(f"❌ 초기화 실패: {str(e)}")
     
     # 세션 상태 초기화
-    if "analyzer" not in st.session_state:
-        st.session_state.analyzer = None
-    if "analysis_result" not in st.session_state:
-        st.session_state.analysis_result = None
-    if "similar_rfps" not in st.session_state:
-        st.session_state.similar_rfps = []
-    if "qa_question" not in st.session_state:
-        st.session_state.qa_question = ""
-    if "qa_answer" not in st.session_state:
-        st.session_state.qa_answer = ""
-    if "example_question" not in st.session_state:
-        st.session_state.example_question = ""
+    for key, default in _SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = default() if callable(default) else default
     
     # 메인 탭
     tab1, tab2, tab3, tab4 = st.tabs(["📄 RFP 분석", "❓ 질의응답", "🔍 유사 RFP 검색", "📝 제안서 생성"])
@@ -76,55 +268,101 @@ def main():
             uploaded_file = st.file_uploader("RFP 파일을 업로드하세요", type=['pdf', 'docx', 'txt'])
             
             if uploaded_file is not None:
-                # 임시 파일로 저장
-                temp_file_path = f"temp_{uploaded_file.name}"
-                with open(temp_file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
+                # 제목은 메타데이터/첫 줄만 읽으므로 본문 추출 전에 바로 표시
+                upload_title = _uploaded_title(st.session_state.analyzer, uploaded_file)
                 st.success(f"✅ 파일이 업로드되었습니다: {uploaded_file.name}")
+                st.info(f"📋 문서 제목: {upload_title}")
                 
                 # 분석 버튼
                 if st.button("🔍 RFP 분석 시작"):
                     with st.spinner("RFP를 분석하고 있습니다..."):
                         try:
-                            # 텍스트 추출 (제목도 함께 추출)
-                            result = st.session_state.analyzer.extract_text_from_file(temp_file_path)
+                            # 동일한 파일을 이미 분석했다면 이전 결과 재사용
+                            file_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+                            cached = _load_cached_analysis(file_hash)
+                            
+                            if cached:
+                                analysis_result, rfp_content, pdf_title, similar_rfps = cached
+                                if similar_rfps is None:
+                                    # 유사 RFP 목록을 저장하지 않은 이전 캐시는 같은 제목으로 다시 검색
+                                    similar_rfps = _search_similar_rfps(st.session_state.analyzer, pdf_title)
+                                st.session_state.similar_rfps = similar_rfps
+                                st.session_state.analysis_result = analysis_result
+                                st.session_state.analysis_result_json = json.dumps(analysis_result, ensure_ascii=False, indent=2)
+                                st.session_state.rfp_content = rfp_content
+                                st.session_state.pdf_title = pdf_title
+                                st.session_state.proposal_draft = ""
+                                st.success("✅ 이전 분석 결과를 불러왔습니다!")
+                            else:
+                                # 임시 파일로 저장 후 본문 텍스트 추출
+                                # 원본 파일명(확장자)을 그대로 유지하도록 임시 디렉터리에 저장
+                                temp_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+                                _pending_temp_dirs().add(temp_dir)
+                                try:
+                                    temp_file_path = os.path.join(temp_dir, os.path.basename(uploaded_file.name))
+                                    uploaded_file.seek(0)
+                                    with open(temp_file_path, "wb") as f:
+                                        shutil.copyfileobj(uploaded_file, f, length=UPLOAD_COPY_BUFFER_SIZE)
+                                    rfp_content = st.session_state.analyzer.extract_text(temp_file_path)
+                                finally:
+                                    # 임시 파일 삭제는 백그라운드에서 진행
+                                    _background_executor().submit(_remove_temp_dir, temp_dir)
                             
-                            if result and len(result) == 2:
-                                rfp_content, pdf_title = result
+                                pdf_title = upload_title
                                 
                                 if rfp_content:
-                                    # GPT 분석
-                                    analysis_result = st.session_state.analyzer.analyze_rfp_with_gpt(rfp_content)
-                                    
+                                    # GPT 분석 + 유사 RFP 검색 + 본문 임베딩 (동시 실행)
+                                    analysis_result, similar_rfps, content_vector = asyncio.run(
+                                        _analyze_and_prefetch(st.session_state.analyzer, rfp_content, pdf_title)
+                                    )
+                                
                                     if analysis_result:
-                                        # Azure AI Search에 저장 (PDF 제목 포함)
-                                        if st.session_state.analyzer.store_rfp_in_search(analysis_result, rfp_content, pdf_title):
-                                            st.success("✅ RFP가 성공적으로 저장되었습니다!")
-                                        
+                                        # Azure AI Search 저장은 백그라운드에서 진행 (PDF 제목, 미리 계산한 임베딩 포함)
+                                        st.session_state.store_future = _background_executor().submit(
+                                            _store_rfp, st.session_state.analyzer,
+                                            analysis_result, rfp_content, pdf_title,
+                                            content_vector=content_vector
+                                        )
+                                    
+                                        st.session_state.similar_rfps = similar_rfps
                                         st.session_state.analysis_result = analysis_result
+                                        st.session_state.analysis_result_json = json.dumps(analysis_result, ensure_ascii=False, indent=2)
                                         st.session_state.rfp_content = rfp_content
                                         st.session_state.pdf_title = pdf_title
+                                        st.session_state.proposal_draft = ""
+                                        _save_cached_analysis(file_hash, analysis_result, rfp_content, pdf_title, similar_rfps)
                                         st.success("✅ RFP 분석이 완료되었습니다!")
-                                        st.rerun()
                                     else:
                                         st.error("❌ RFP 분석에 실패했습니다.")
                                 else:
                                     st.error("❌ 파일에서 텍스트를 추출할 수 없습니다.")
-                            else:
-                                st.error("❌ 파일에서 텍스트를 추출할 수 없습니다.")
                         except Exception as e:
                             st.error(f"❌ 분석 중 오류가 발생했습니다: {str(e)}")
-                        finally:
-                            # 임시 파일 삭제
-                            if os.path.exists(temp_file_path):
-                                os.remove(temp_file_path)
+                
+                # 검색 인덱스 저장 상태 표시
+                store_future = st.session_state.get("store_future")
+                if store_future is not None:
+                    if not store_future.done():
+                        st.info("⏳ RFP를 Azure AI Search에 저장하고 있습니다...")
+                    else:
+                        try:
+                            stored, store_warnings = store_future.result()
+                            if stored:
+                                st.success("✅ RFP가 성공적으로 저장되었습니다!")
+                            else:
+                                st.error("❌ RFP 저장에 실패했습니다.")
+                            for message in store_warnings:
+                                st.warning(f"⚠️ {message}")
+                        except Exception as e:
+                            st.error(f"❌ RFP 저장 오류: {str(e)}")
+                        st.session_state.store_future = None
                 
                 # 분석 결과 표시
                 if st.session_state.analysis_result:
                     st.markdown("---")
                     st.subheader("📊 분석 결과")
-                    st.json(st.session_state.analysis_result)
+                    # 분석 완료 시 한 번만 직렬화한 문자열을 그대로 표시
+                    st.code(st.session_state.analysis_result_json, language="json")
     
     with tab2:
         st.header("❓ 질의응답")
@@ -132,46 +370,53 @@ def main():
         if st.session_state.analysis_result is None:
             st.warning("❌ 먼저 RFP를 분석해주세요.")
         else:
-            # 질문 입력
-            question = st.text_area("RFP에 대해 질문하세요", value=st.session_state.qa_question, height=100)
+            # 질문 입력 (예시 질문/초기화 버튼은 콜백으로 위젯 값을 바꾸므로 별도 rerun 불필요)
+            question = st.text_area("RFP에 대해 질문하세요", key="qa_question", height=100)
             
             # 예시 질문 버튼들
             col1, col2, col3 = st.columns(3)
             with col1:
-                if st.button("예시 질문 1"):
-                    st.session_state.example_question = "이 RFP의 주요 목적은 무엇인가요?"
-                    st.rerun()
+                st.button("예시 질문 1", on_click=_set_question, args=(EXAMPLE_QUESTIONS[0],))
             with col2:
-                if st.button("예시 질문 2"):
-                    st.session_state.example_question = "프로젝트 일정은 어떻게 되어 있나요?"
-                    st.rerun()
+                st.button("예시 질문 2", on_click=_set_question, args=(EXAMPLE_QUESTIONS[1],))
             with col3:
-                if st.button("예시 질문 3"):
-                    st.session_state.example_question = "예산 범위는 얼마인가요?"
-                    st.rerun()
-            
-            if st.session_state.example_question:
-                question = st.session_state.example_question
-                st.session_state.example_question = ""
+                st.button("예시 질문 3", on_click=_set_question, args=(EXAMPLE_QUESTIONS[2],))
             
             # 질문 초기화 버튼
-            if st.button("질문 초기화"):
-                st.session_state.qa_question = ""
-                st.session_state.qa_answer = ""
-                st.rerun()
+            st.button("질문 초기화", on_click=_reset_question)
             
             # 답변 생성
+            answer_rendered = False
             if st.button("답변 생성"):
                 if question:
                     with st.spinner("답변을 생성하고 있습니다..."):
                         try:
-                            answer = st.session_state.analyzer.ask_question_about_rfp(
-                                question, 
-                                st.session_state.rfp_content, 
-                                st.session_state.analysis_result
-                            )
+                            # 캐시 조회 (RFP별로 범위 분리): 정확 일치 → 시맨틱 → GPT
+                            qa_cache = st.session_state.qa_cache
+                            qa_cache.set_scope(st.session_state.get("pdf_title"))
+                            answer = qa_cache.get_exact(question)
+                            
+                            if answer is None:
+                                q_emb = _question_embedding(st.session_state.analyzer, question)
+                                answer = qa_cache.lookup(q_emb) if q_emb is not None else None
+                                
+                                if answer is None:
+                                    # 캐시 미스: 답변을 스트리밍으로 바로 표시
+                                    st.markdown("---")
+                                    st.subheader("💬 답변")
+                                    answer = st.write_stream(st.session_state.analyzer.ask_question_about_rfp_stream(
+                                        question, 
+                                        st.session_state.rfp_content, 
+                                        st.session_state.analysis_result
+                                    ))
+                                    answer_rendered = True
+                                    if q_emb is not None and _is_cacheable(answer):
+                                        qa_cache.put(q_emb, answer)
+                                
+                                if _is_cacheable(answer):
+                                    qa_cache.put_exact(question, answer)
+                            
                             st.session_state.qa_answer = answer
-                            st.session_state.qa_question = question
                         except Exception as e:
                             st.error(f"❌ 답변 생성 중 오류가 발생했습니다: {str(e)}")
                 else:
@@ -179,9 +424,10 @@ def main():
             
             # 답변 표시
             if st.session_state.qa_answer:
-                st.markdown("---")
-                st.subheader("💬 답변")
-                st.write(st.session_state.qa_answer)
+                if not answer_rendered:
+                    st.markdown("---")
+                    st.subheader("💬 답변")
+                    st.write(st.session_state.qa_answer)
                 
                 # 답변 복사 버튼
                 if st.button("답변 복사"):
@@ -199,7 +445,8 @@ def main():
                 if search_query:
                     with st.spinner("유사 RFP를 검색하고 있습니다..."):
                         try:
-                            similar_rfps = st.session_state.analyzer.search_similar_rfps(search_query)
+                            analyzer = st.session_state.analyzer
+                            similar_rfps = _search_similar_rfps(analyzer, search_query)
                             st.session_state.similar_rfps = similar_rfps
                             
                             if similar_rfps:
@@ -222,35 +469,73 @@ def main():
                         st.write(f"**평가 기준:** {rfp['evaluation_criteria']}")
                         st.write(f"**생성일:** {rfp['created_date']}")
     
-    # with tab4:
-    #     st.header("📝 제안서 생성")
+    with tab4:
+        st.header("📝 제안서 생성")
         
-    #     if st.session_state.analysis_result is None:
-    #         st.warning("❌ 먼저 RFP를 분석해주세요.")
-    #     else:
-            # 제안서 초안 생성 기능 주석 처리
-            # if st.button("📝 제안서 초안 생성"):
-            #     with st.spinner("제안서 초안을 생성하고 있습니다..."):
-            #         similar_rfps = st.session_state.similar_rfps
-            #         proposal_draft = st.session_state.analyzer.generate_proposal_draft(st.session_state.analysis_result, similar_rfps)
-            #         
-            #         if proposal_draft:
-            #             st.markdown("---")
-            #             st.subheader("📄 제안서 초안")
-            #             st.markdown("---")
-            #             st.text_area("제안서 내용", proposal_draft, height=400)
-            #             
-            #             # 파일 다운로드
-            #             st.download_button(
-            #                 label="💾 제안서 다운로드",
-            #                 data=proposal_draft,
-            #                 file_name=f"proposal_draft_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-            #                 mime="text/plain"
-            #             )
-            #         else:
-            #             st.error("❌ 제안서 초안 생성에 실패했습니다.")
+        if st.session_state.analysis_result is None:
+            st.warning("❌ 먼저 RFP를 분석해주세요.")
+        else:
+            if st.button("📝 제안서 초안 생성", disabled=st.session_state.draft_future is not None):
+                # 생성은 백그라운드 스레드에서 진행하고, 도착한 조각은 draft_parts에 쌓임
+                # 토큰 사용량과 일부 실패 사유도 세션별로 기록 (analyzer는 모든 세션이 공유)
+                st.session_state.draft_parts = []
+                st.session_state.draft_usage = {}
+                st.session_state.draft_warnings = []
+                st.session_state.proposal_draft = ""
+                st.session_state.draft_future = _background_executor().submit(
+                    _collect_stream,
+                    st.session_state.analyzer.generate_proposal_draft_stream(
+                        st.session_state.analysis_result, st.session_state.similar_rfps,
+                        usage=st.session_state.draft_usage,
+                        warnings=st.session_state.draft_warnings
+                    ),
+                    st.session_state.draft_parts
+                )
             
-            # st.info("📝 제안서 초안 생성 기능이 비활성화되었습니다.")
+            draft_future = st.session_state.draft_future
+            if draft_future is not None or st.session_state.proposal_draft:
+                st.markdown("---")
+                st.subheader("📄 제안서 초안")
+                st.markdown("---")
+                
+                draft_placeholder = st.empty()
+                if draft_future is not None:
+                    # Ⅰ~Ⅴ 섹션이 도착하는 대로 순서대로 표시 (다른 위젯 조작으로 rerun되어도 생성은 계속됨)
+                    with st.status("📝 제안서 초안을 생성하고 있습니다...") as status:
+                        while not draft_future.done():
+                            draft_placeholder.markdown("".join(st.session_state.draft_parts))
+                            time.sleep(DRAFT_POLL_INTERVAL)
+                        
+                        try:
+                            st.session_state.proposal_draft = draft_future.result()
+                            status.update(label="✅ 제안서 초안 생성 완료", state="complete")
+                        except Exception as e:
+                            status.update(label=f"❌ 제안서 초안 생성 오류: {str(e)}", state="error")
+                        st.session_state.draft_future = None
+                
+                # 백그라운드 스레드에서는 st.warning이 표시되지 않으므로 생성이 끝난 뒤 여기서 표시
+                for message in st.session_state.draft_warnings:
+                    st.warning(f"⚠️ {message}")
+                
+                proposal_draft = st.session_state.proposal_draft
+                draft_placeholder.markdown(proposal_draft)
+                if proposal_draft:
+                    usage = st.session_state.draft_usage
+                    if usage.get("prompt_tokens"):
+                        st.caption(
+                            f"입력 토큰 {usage['prompt_tokens']:,} (프롬프트 캐시 {usage['cached_tokens']:,}) · "
+                            f"출력 토큰 {usage['completion_tokens']:,}"
+                        )
+                    
+                    # 파일 다운로드
+                    st.download_button(
+                        label="💾 제안서 다운로드",
+                        data=proposal_draft,
+                        file_name=f"proposal_draft_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                        mime="text/plain"
+                    )
+                else:
+                    st.error("❌ 제안서 초안 생성에 실패했습니다.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # faiss가 없으면 NumPy 스캔만 사용
+    faiss = None
+
+# 정확 일치 캐시(L1) 최대 항목 수 (LRU)
+EXACT_CACHE_SIZE = 1500
+
+# 시맨틱 캐시(질문 임베딩) 최대 항목 수 (넘으면 먼저 저장한 항목부터 제거)
+SEMANTIC_CACHE_SIZE = 1500
+
+# 코사인 유사도가 이 값 이상이면 같은 질문으로 간주
+SIMILARITY_THRESHOLD = 0.85
+
+# 이미 저장된 질문과 이 값보다 유사하면 새로 추가하지 않고 기존 항목의 답변을 갱신
+DEDUP_THRESHOLD = 0.95
+
+# 항목 수가 이 값 이상이면 FAISS 인덱스로 검색
+FAISS_MIN_ENTRIES = 100
+
+# 정규화된 벡터의 성분은 [-1, 1] 범위이므로 127배해 int8로 저장
+QUANT_SCALE = 1 / 127
+
+
+def quantize(v: np.ndarray) -> np.ndarray:
+    """L2 정규화된 float 벡터를 int8로 양자화"""
+    return np.clip(np.round(np.asarray(v, dtype=np.float32) * 127), -128, 127).astype(np.int8)
+
+
+def _new_faiss_index(dim: int):
+    """[-1, 1] 범위를 8bit로 양자화해 저장하는 내적(코사인) 인덱스 생성"""
+    index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit_uniform, faiss.METRIC_INNER_PRODUCT)
+    index.train(np.stack([-np.ones(dim), np.ones(dim)]).astype(np.float32))
+    return index
+
+
+class QACache:
+    """질문 임베딩 기반 시맨틱 Q&A 캐시"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.scope = None
+        self.clear()
+
+    def clear(self):
+        """캐시 비우기"""
+        self.exact = OrderedDict()  # md5(정규화 질문 + RFP 제목) -> 답변
+        self.matrix = None  # (N, dim) int8, 행마다 L2 정규화된 질문 임베딩을 양자화
+        self.index = None  # 항목이 많아지면 matrix 대신 사용하는 FAISS 인덱스
+        self.answers = []
+
+    def set_scope(self, scope):
+        """캐시 범위(RFP) 설정 - 다른 RFP로 바뀌면 이전 답변이 섞이지 않도록 초기화"""
+        if scope != self.scope:
+            self.scope = scope
+            self.clear()
+
+    def _exact_key(self, question: str) -> str:
+        normalized = question.strip().lower()
+        return hashlib.md5((normalized + str(self.scope or "")).encode("utf-8")).hexdigest()
+
+    def get_exact(self, question: str):
+        """동일한 질문의 답변 조회 (임베딩 호출 없이 O(1) 조회, 없으면 None)"""
+        key = self._exact_key(question)
+        answer = self.exact.get(key)
+        if answer is not None:
+            self.exact.move_to_end(key)
+        return answer
+
+    def put_exact(self, question: str, answer: str):
+        """질문 문자열과 답변 저장 (오래된 항목부터 제거)"""
+        key = self._exact_key(question)
+        self.exact[key] = answer
+        self.exact.move_to_end(key)
+        if len(self.exact) > EXACT_CACHE_SIZE:
+            self.exact.popitem(last=False)
+
+    def _nearest(self, q_emb: np.ndarray):
+        """가장 유사한 캐시 항목의 (위치, 코사인 유사도)"""
+        if self.index is not None:
+            sims, ids = self.index.search(np.asarray(q_emb, dtype=np.float32)[None, :], 1)
+            return int(ids[0, 0]), float(sims[0, 0])
+
+        # 정규화된 벡터끼리의 내적 = 코사인 유사도 (int8 곱의 합은 int32로 누적)
+        q8 = quantize(q_emb)
+        sims = (self.matrix.astype(np.int32) @ q8.astype(np.int32)) * (QUANT_SCALE * QUANT_SCALE)
+        best = int(np.argmax(sims))
+        return best, float(sims[best])
+
+    def lookup(self, q_emb: np.ndarray):
+        """유사한 질문의 답변 조회 (없으면 None)"""
+        if not self.answers:
+            return None
+
+        best, sim = self._nearest(q_emb)
+        if sim >= self.threshold:
+            return self.answers[best]
+        return None
+
+    def put(self, q_emb: np.ndarray, answer: str):
+        """질문 임베딩과 답변 저장 (거의 같은 질문이 있으면 답변만 갱신, SEMANTIC_CACHE_SIZE를 넘으면 가장 오래된 항목 제거)"""
+        if self.answers:
+            best, sim = self._nearest(q_emb)
+            if sim > DEDUP_THRESHOLD:
+                self.answers[best] = answer
+                return
+
+        if self.index is not None:
+            self.index.add(np.asarray(q_emb, dtype=np.float32)[None, :])
+        else:
+            row = quantize(q_emb)[None, :]
+            self.matrix = row if self.matrix is None else np.vstack([self.matrix, row])
+
+            # 항목이 충분히 많아지면 FAISS 인덱스로 옮겨 검색
+            if faiss is not None and len(self.matrix) >= FAISS_MIN_ENTRIES:
+                self.index = _new_faiss_index(self.matrix.shape[1])
+                self.index.add(self.matrix.astype(np.float32) * QUANT_SCALE)
+                self.matrix = None
+
+        self.answers.append(answer)
+        if len(self.answers) > SEMANTIC_CACHE_SIZE:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        """가장 먼저 저장한 항목 제거 (matrix 행/FAISS id가 answers 위치와 어긋나지 않도록 함께 제거)"""
+        if self.index is not None:
+            # IndexScalarQuantizer는 제거 후 뒤 항목의 id를 앞으로 당기므로 answers와 위치가 그대로 맞음
+            self.index.remove_ids(np.array([0], dtype=np.int64))
+        else:
+            self.matrix = np.delete(self.matrix, 0, axis=0)
+        del self.answers[0]
+
+    def __len__(self):
+        return len(self.answers)
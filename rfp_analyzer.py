@@ -1,41 +1,387 @@
+import asyncio
+import hashlib
 import json
+import logging
+import mmap
+import multiprocessing
 import os
+import queue
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime
-from typing import Dict, List, Any
-import pandas as pd
+from typing import Dict, List, Any, Tuple
+from xml.etree import ElementTree
 import numpy as np
 from dotenv import load_dotenv
 from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
 from azure.search.documents.models import VectorizedQuery
 from azure.core.credentials import AzureKeyCredential
-from azure.search.documents.indexes.models import (
-    SearchIndex,
-    SearchField,
-    SearchFieldDataType,
-    SimpleField,
-    SearchableField,
-    VectorSearch,
-    HnswAlgorithmConfiguration,
-    VectorSearchProfile,
-    SemanticConfiguration,
-    SemanticPrioritizedFields,
-    SemanticField,
-    SemanticSearch
-)
-import openai
-from openai import AzureOpenAI
-import PyPDF2
-import docx
+from azure.core.exceptions import ResourceNotFoundError
+from azure.core.pipeline.transport import RequestsTransport
+import httpx
+import jinja2
+import requests
+from pydantic import BaseModel, ConfigDict
+from openai import AzureOpenAI, AsyncAzureOpenAI, RateLimitError, APITimeoutError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+import tiktoken
 from io import BytesIO
 import re
 import streamlit as st
 
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pypdfium2가 없으면 PyPDF2로 추출
+    pdfium = None
+
+try:
+    import diskcache
+except ImportError:  # diskcache가 없으면 임베딩 캐시 없이 매번 API 호출
+    diskcache = None
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 json으로 같은 형식의 문자열 생성
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# 분석 결과 등 로컬 캐시 저장 위치
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "rfp_analyzer")
+
+# 문서 임베딩 모델과 벡터 차원
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_DIMENSIONS = 1536
+
+# 임베딩 청크 하나의 최대 토큰 수 (모델 입력 한도 8191 토큰)
+EMBEDDING_CHUNK_TOKENS = 8000
+
+# 임베딩 캐시 보관 기간 (초)
+EMBEDDING_CACHE_TTL = 7 * 24 * 60 * 60
+
+# 임베딩 API 한 번의 요청에 넣을 수 있는 최대 입력 수와 전체 토큰 수
+EMBEDDING_BATCH_SIZE = 2048
+EMBEDDING_REQUEST_TOKENS = 300000
+
+# 비동기 임베딩 시 동시에 보낼 최대 요청 수 (분석과 동시에 실행되므로 요청 한도 초과 방지)
+EMBEDDING_CONCURRENCY = 4
+
+# 오프라인 호출(bulk_mode 블록 안의 저장, use_batch=True)에서 임베딩할 청크의 토큰 수 합이 이 값을 넘으면 Batch API(비용 50%, 별도 할당량)로 임베딩
+BATCH_EMBEDDING_MIN_TOKENS = 50 * EMBEDDING_CHUNK_TOKENS
+
+# 임베딩 Batch API 작업 완료를 기다리는 최대 시간 (초, 넘으면 작업 취소 후 온라인 API 사용)
+BATCH_POLL_TIMEOUT = 60 * 60
+
+# 제안서 초안 일괄 생성(Batch API) 작업을 기다리는 최대 시간 (초, completion_window 24시간에 여유를 둠)
+PROPOSAL_BATCH_POLL_TIMEOUT = 25 * 60 * 60
+
+# 텍스트를 추출할 최대 PDF 페이지 수
+MAX_PDF_PAGES = 200
+
+# (PyPDF2 사용 시) 이 크기 미만의 PDF는 메모리로 읽어서 처리
+PDF_IN_MEMORY_MAX_BYTES = 100 * 1024 * 1024
+
+# (PyPDF2 사용 시) PDF 페이지 수가 이 값 이상이면 여러 프로세스로 나누어 텍스트 추출
+PDF_PARALLEL_MIN_PAGES = 16
+
+# 청크 인덱스에 저장할 검색용 청크 하나의 토큰 수 (단락 크기)
+SEARCH_CHUNK_TOKENS = 512
+
+# 유사 RFP 검색 시 같은 문서의 청크를 걸러낸 뒤에도 충분하도록 더 가져올 청크 배수
+CHUNK_SEARCH_OVERSAMPLE = 4
+
+# 유사 RFP 결과에 필요한 문서 필드
+SIMILAR_RFP_FIELDS = ["title", "project_type", "requirements", "evaluation_criteria", "created_date"]
+
+# Azure AI Search에 한 번에 업로드할 문서 수 (서비스 한도 1000개/16MB)
+SEARCH_UPLOAD_BATCH_SIZE = 500
+
+# DOCX 본문(WordprocessingML) 네임스페이스
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# 질의응답 캐시용 임베딩 모델
+QA_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# JSON 모드를 지원하지 않는 배포에서 응답 속 JSON 객체를 찾는 패턴
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# 질의응답 프롬프트에 넣을 RFP 본문 최대 토큰 수 (gpt-4o-mini 128k 컨텍스트에서 지침/답변 여유분 제외)
+QA_CONTEXT_TOKENS = 100000
+
+# 제안서 초안 섹션 (제목, 작성할 세부 목차, 최대 출력 토큰 수, 모델) - 섹션별로 동시에 생성
+# 최대 출력 토큰은 섹션 분량에 맞춰 배분 (출력 토큰 수에 비례해 생성 시간이 늘어남)
+# JSON 구조화 출력은 키·따옴표·이스케이프된 줄바꿈 등으로 같은 본문보다 토큰을 더 쓰므로 본문 분량의 약 1.7배로 잡음
+# 기술 내용이 핵심인 Ⅲ 섹션만 gpt-4o, 나머지 정형적인 섹션은 gpt-4o-mini 사용
+# (FORCE_MODEL 환경 변수를 지정하면 모든 섹션에 해당 모델 사용)
+PROPOSAL_SECTIONS = [
+    ("Ⅰ. 제안 개요", "- 사업이해도", 500, "gpt-4o-mini"),
+    ("Ⅱ. 제안 업체 일반 (KT DS)", "1. 일반 현황\n2. 조직 및 인원\n3. 주요 사업 내용\n4. 주요 사업 실적", 700, "gpt-4o-mini"),
+    ("Ⅲ. 프로젝트 수행 부문", "1. 추진 전략 및 개발 방법론\n2. 시스템 구성도\n3. 시스템 구축\n"
+                           "    > 3.1 개발대상업무 내역 및 구성요건\n    > 3.2 연계 범위\n    > 3.3 표준화 요건\n"
+                           "    > 3.4 보안 및 웹 표준화, 성능시험 요구사항\n    > 3.5 테스트 수행 방안", 2000, "gpt-4o"),
+    ("Ⅳ. 프로젝트 관리 부문", "1. 프로젝트 관리 방법론\n2. 추진 일정 계획\n3. 투입 인력 및 이력 사항", 1000, "gpt-4o-mini"),
+    ("Ⅴ. 지원 부문", "1. 교육 훈련 계획\n2. 기술지원 계획\n3. 하자보수 계획\n4. 안정화", 900, "gpt-4o-mini"),
+]
+
+# 섹션 응답이 최대 출력 토큰 수에 걸려 잘렸을 때 최대 출력 토큰 수를 몇 배로 늘려 한 번 더 요청할지
+PROPOSAL_TRUNCATION_RETRY_FACTOR = 2
+
+# 제안서 작성 고정 지침 - 요청마다 바이트 단위로 동일해야 프롬프트 캐시가 적용되므로 동적인 값을 넣지 않음
+PROPOSAL_SYSTEM_PROMPT = """당신은 경험이 풍부한 제안서 작성 전문가입니다. 기술적으로 정확하고 설득력 있는 제안서를 작성합니다.
+
+사용자가 제공하는 RFP 분석 결과, 기술 솔루션 매핑, 유사 프로젝트 사례를 바탕으로 전문적인 제안서 초안을 작성합니다.
+
+**제안서 작성 지침:**
+- 요구사항 고유번호(예: ECR-HWR-SVR-02, REQ-XXX-XXX 등)를 명시하여 각 요구사항에 대한 구체적인 솔루션을 제시하세요
+- 각 요구사항별로 어떻게 해결할 것인지 명확하게 설명하세요
+- 요구사항 고유번호와 함께 산출물도 언급하세요 (예: ECR-HWR-SVR-02 요구사항에 대한 아키텍처 설계서 제출)
+
+제안서 전체 구조는 다음과 같으며, 요청받은 섹션만 작성합니다:
+
+""" + "\n\n".join(f"**{title}**\n{outline}" for title, outline, *_ in PROPOSAL_SECTIONS)
+
+# 제안서 템플릿은 모듈 로드 시 한 번만 컴파일하고 요청마다 렌더링만 수행
+_JINJA_ENV = jinja2.Environment(autoescape=False, auto_reload=False, trim_blocks=True)
+
+# 제안서 섹션 요청 프롬프트 템플릿
+# (RFP별 정보 → 섹션 지시 순으로 배치해 같은 RFP의 섹션 요청끼리 앞부분이 같도록 함)
+_PROPOSAL_SECTION_TEMPLATE = _JINJA_ENV.from_string("""
+RFP 분석 결과:
+{{ rfp_summary }}
+
+기술 솔루션 매핑: {{ tech_mapping }}
+
+유사 프로젝트 사례:{{ similar_rfps_text }}
+
+위 제안서 구조 중 다음 섹션만 세부 목차 항목별로 작성해주세요 (섹션 제목과 서식은 별도로 붙이므로 본문만 작성):
+
+{{ section_title }}
+{{ section_outline }}
+""")
+
+# 구조화된 출력으로 받은 제안서 섹션을 기존 제안서 형식(Markdown)으로 변환하는 템플릿
+_PROPOSAL_SECTION_MARKDOWN = _JINJA_ENV.from_string("""**{{ title }}**
+{% for subsection in section.subsections %}
+
+**{{ subsection.heading }}**
+{{ subsection.content }}
+{% endfor %}""")
+
+
+class ProposalSubsection(BaseModel):
+    """제안서 섹션의 세부 목차 항목"""
+    model_config = ConfigDict(extra="forbid")
+    
+    heading: str
+    content: str
+
+
+class ProposalSection(BaseModel):
+    """제안서 섹션 하나의 구조화된 출력 (섹션 제목과 서식은 로컬에서 렌더링)"""
+    model_config = ConfigDict(extra="forbid")
+    
+    subsections: List[ProposalSubsection]
+
+
+# 제안서 섹션 응답 형식 - 모델이 ProposalSection 스키마에 맞는 JSON만 생성하도록 강제
+PROPOSAL_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "proposal_section",
+        "strict": True,
+        "schema": ProposalSection.model_json_schema()
+    }
+}
+
+# 요구사항별 대응 방안을 한 번의 요청으로 생성할 요구사항 수 (요청 수를 줄여 분당 요청 한도 절약)
+REQUIREMENT_BATCH_SIZE = 10
+
+# 요구사항 하나의 대응 방안에 배정하는 최대 출력 토큰 수 (한글 2~3문장 + JSON 구조 여유분)
+REQUIREMENT_SOLUTION_TOKENS = 250
+
+# 요구사항별 대응 방안을 붙일 섹션 위치 (Ⅲ. 프로젝트 수행 부문 뒤)
+REQUIREMENT_SECTION_INDEX = 2
+
+# 요구사항별 대응 방안 작성 지침 (JSON으로 받아 로컬에서 제안서 형식으로 변환)
+REQUIREMENT_SOLUTION_PROMPT = """당신은 경험이 풍부한 제안서 작성 전문가입니다.
+
+사용자가 제공하는 요구사항 목록의 각 요구사항에 대해, 기술 솔루션 매핑을 참고하여 구체적인 해결 방안을 작성합니다.
+- 해결 방안은 2~3문장으로 작성하고, 제출할 산출물을 함께 언급하세요 (예: 아키텍처 설계서 제출)
+- 목록의 모든 요구사항에 대해 빠짐없이 작성하세요
+
+다음 JSON 형식으로만 응답하세요:
+{"solutions": [{"id": "요구사항 고유번호", "solution": "해결 방안"}]}"""
+
+# 같은 프롬프트로 생성한 제안서 섹션을 재사용하는 캐시의 최대 항목 수 (LRU)
+DRAFT_CACHE_SIZE = 128
+
+# 분석 결과별 RFP 요약 문자열 캐시의 최대 항목 수 (LRU, 재시도 시 요약을 다시 만들지 않음)
+SUMMARY_CACHE_SIZE = 32
+
+# 제안서 섹션 생성 시 동시에 보낼 최대 요청 수 (분당 요청 한도 고려, OPENAI_CONCURRENCY 환경 변수로 변경 가능)
+PROPOSAL_CONCURRENCY = 5
+
+# 요청 한도 초과(429)·타임아웃 시 재시도 횟수 (대기 시간은 1초부터 두 배씩, 최대 30초)
+OPENAI_RETRY_ATTEMPTS = 6
+
+# 질의응답 실패 시 반환하는 안내 문구 (캐시에 저장하지 않음)
+QA_ERROR_ANSWER = "질문 처리 중 오류가 발생했습니다. 다시 시도해주세요."
+
+def _log_openai_retry(retry_state):
+    """재시도 전 오류 종류와 서버가 알려준 Retry-After 값을 로그로 남김"""
+    error = retry_state.outcome.exception()
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    logger.warning(
+        "OpenAI 요청 재시도 (%d회 실패, %s, Retry-After: %s)",
+        retry_state.attempt_number, type(error).__name__, retry_after
+    )
+
+
+# 요청 한도 초과·타임아웃만 지수 백오프로 재시도하고, 끝내 실패하면 원래 예외를 그대로 전달
+_openai_retry = retry(
+    wait=wait_exponential(min=1, max=30),
+    stop=stop_after_attempt(OPENAI_RETRY_ATTEMPTS),
+    retry=retry_if_exception_type((RateLimitError, APITimeoutError)),
+    before_sleep=_log_openai_retry,
+    reraise=True
+)
+
+
+def _dumps_sorted(obj) -> str:
+    """키를 정렬한 압축 JSON 문자열 (한글은 이스케이프하지 않음, orjson이 있으면 orjson 사용)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _has_content(category_data) -> bool:
+    """분석 카테고리에 프롬프트에 넣을 내용이 있는지 (값이 모두 비어 있으면 False)"""
+    if isinstance(category_data, dict):
+        return any(value for value in category_data.values())
+    return bool(category_data)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """모델의 토크나이저 (모델별로 처음 한 번만 로드)"""
+    return tiktoken.encoding_for_model(model)
+
+def _char_boundary(encoding, tokens: List[int], start: int, end: int) -> int:
+    """tokens[start:end]를 자를 위치를 글자 경계로 당김
+    
+    한글 한 글자(UTF-8 3바이트)가 여러 토큰으로 나뉘는 경우가 있어, 토큰 위치에서 그대로 자르면
+    청크 양끝이 U+FFFD로 깨집니다. 다음 토큰이 UTF-8 연속 바이트(0b10xxxxxx)로 시작하지 않을 때까지 당깁니다.
+    """
+    cut = end
+    while start < cut < len(tokens) and encoding.decode_single_token_bytes(tokens[cut])[0] & 0xC0 == 0x80:
+        cut -= 1
+    # 청크 전체가 한 글자 안에 있는 비정상적인 경우에는 원래 위치에서 자름
+    return cut if cut > start else end
+
+@lru_cache(maxsize=8)
+def _truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """텍스트를 모델 토큰 기준 앞에서부터 max_tokens개까지만 남김 (같은 문서에 대한 반복 질문은 캐시 사용)"""
+    encoding = _encoding(model)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:_char_boundary(encoding, tokens, 0, max_tokens)])
+
+@contextmanager
+def _open_pdf(file_path):
+    """PyPDF2로 읽을 PDF 스트림 (작은 파일은 BytesIO로 읽어 파일 핸들을 바로 닫고 페이지마다 seek하지 않음)"""
+    with open(file_path, 'rb') as file:
+        if os.path.getsize(file_path) >= PDF_IN_MEMORY_MAX_BYTES:
+            yield file
+            return
+        data = file.read()
+    yield BytesIO(data)
+
+def _extract_pdf_pages(args):
+    """PDF의 [start, end) 페이지 텍스트 추출 (프로세스 풀 작업 함수, 페이지별 (텍스트, 오류) 반환)"""
+    import PyPDF2
+    
+    file_path, start, end = args
+    results = []
+    with _open_pdf(file_path) as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for i in range(start, end):
+            try:
+                results.append((pdf_reader.pages[i].extract_text(), None))
+            except Exception as page_error:
+                results.append((None, str(page_error)))
+    return results
+
+def _iter_docx_paragraphs(file):
+    """DOCX 단락 텍스트를 문서 순서대로 스트리밍 (document.xml 전체를 트리로 만들지 않고 단락마다 해제)"""
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml:
+        parts = []
+        in_run = 0
+        for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if tag == _W_NS + "r":
+                in_run += 1 if event == "start" else -1
+            elif event != "end":
+                continue
+            elif tag == _W_NS + "p":
+                yield "".join(parts)
+                parts = []
+                elem.clear()
+            elif in_run:
+                # 런 안의 텍스트, 탭, 줄바꿈만 본문으로 취급 (단락 속성의 탭 정의 등은 제외)
+                if tag == _W_NS + "t":
+                    parts.append(elem.text or "")
+                elif tag == _W_NS + "tab":
+                    parts.append("\t")
+                elif tag in (_W_NS + "br", _W_NS + "cr"):
+                    parts.append("\n")
+
 class RFPAnalyzer:
-    def __init__(self):
+    def __init__(self, search_endpoint=None, search_key=None, search_index_name=None,
+                 openai_endpoint=None, openai_key=None, openai_api_version=None):
         self.search_client = None
+        self.chunk_search_client = None
         self.openai_client = None
-        self.index_name = "rfp-documents"
+        self.index_name = search_index_name or "rfp-documents"
+        self.chunk_index_name = f"{self.index_name}-chunks"  # 단락 단위 청크 문서를 저장하는 인덱스
+        
+        # 모든 동기 호출이 공유하는 HTTP 연결 풀 (keep-alive로 TLS 핸드셰이크 재사용)
+        self._http = httpx.Client(
+            http2=True,
+            timeout=60,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+        )
+        self._search_transport = RequestsTransport(session=requests.Session(), session_owner=False)
+        
+        # 스레드별 대량 적재 상태 (analyzer는 모든 세션이 공유하므로 호출한 스레드에만 적용)
+        # - depth: bulk_mode 중첩 깊이
+        # - pending: 업로드 대기 중인 (문서, 청크 문서 목록) (store_rfp_in_search(flush=False)로 모았다가 한 번에 업로드)
+        self._bulk_state = threading.local()
+        
+        # 프롬프트 해시(sha256) -> 생성된 제안서 섹션 (같은 요청은 API 호출 없이 재사용)
+        self._draft_cache = OrderedDict()
+        self._draft_cache_lock = threading.Lock()
+        
+        # 분석 결과 해시(sha256) -> 제안서 프롬프트용 RFP 요약
+        self._summary_cache = OrderedDict()
+        self._summary_cache_lock = threading.Lock()
+        
+        # 같은 텍스트의 임베딩을 다시 계산하지 않도록 내용 해시로 디스크에 캐시
+        self._embedding_cache = (
+            diskcache.Cache(os.path.join(CACHE_DIR, "embeddings")) if diskcache is not None else None
+        )
+        
+        # 접속 정보가 주어지면 바로 서비스 초기화
+        if search_endpoint and openai_endpoint:
+            if not self.initialize_services(search_endpoint, search_key, openai_endpoint, openai_key, openai_api_version):
+                raise RuntimeError("Azure 서비스 초기화에 실패했습니다.")
         
     def initialize_services(self, search_endpoint, search_key, openai_endpoint, openai_key, openai_api_version):
         """Azure 서비스 초기화"""
@@ -45,26 +391,74 @@ class RFPAnalyzer:
             self.search_client = SearchClient(
                 endpoint=search_endpoint,
                 index_name=self.index_name,
-                credential=credential
+                credential=credential,
+                transport=self._search_transport
+            )
+            self.chunk_search_client = SearchClient(
+                endpoint=search_endpoint,
+                index_name=self.chunk_index_name,
+                credential=credential,
+                transport=self._search_transport
             )
             
             # Azure OpenAI 클라이언트 초기화
             self.openai_client = AzureOpenAI(
                 azure_endpoint=openai_endpoint,
                 api_key=openai_key,
-                api_version=openai_api_version
+                api_version=openai_api_version,
+                http_client=self._http
             )
             
+            # 비동기 클라이언트는 이벤트 루프마다 새로 만들어야 하므로 접속 정보만 보관
+            self._search_endpoint = search_endpoint
+            self._search_credential = credential
+            self._openai_config = {
+                "azure_endpoint": openai_endpoint,
+                "api_key": openai_key,
+                "api_version": openai_api_version
+            }
+            
             return True
         except Exception as e:
             st.error(f"❌ 서비스 초기화 오류: {str(e)}")
             return False
     
+    def _async_search_client(self, index_name: str = None):
+        """비동기 Azure AI Search 클라이언트 생성 (async with 로 사용, 기본은 문서 인덱스)"""
+        return AsyncSearchClient(
+            endpoint=self._search_endpoint,
+            index_name=index_name or self.index_name,
+            credential=self._search_credential
+        )
+    
+    def _async_openai_client(self):
+        """비동기 Azure OpenAI 클라이언트 생성 (async with 로 사용)"""
+        return AsyncAzureOpenAI(**self._openai_config)
+    
     def create_search_index(self, search_endpoint, search_key):
         """Azure AI Search 인덱스 생성"""
+        from azure.search.documents.indexes import SearchIndexClient
+        from azure.search.documents.indexes.models import (
+            SearchIndex,
+            SearchField,
+            SearchFieldDataType,
+            SimpleField,
+            SearchableField,
+            VectorSearch,
+            HnswAlgorithmConfiguration,
+            HnswParameters,
+            VectorSearchProfile,
+            ScalarQuantizationCompression,
+            ScalarQuantizationParameters,
+            SemanticConfiguration,
+            SemanticPrioritizedFields,
+            SemanticField,
+            SemanticSearch
+        )
+        
         try:
             credential = AzureKeyCredential(search_key)
-            index_client = SearchIndexClient(endpoint=search_endpoint, credential=credential)
+            index_client = SearchIndexClient(endpoint=search_endpoint, credential=credential, transport=self._search_transport)
             
             # 인덱스 정의
             fields = [
@@ -77,19 +471,34 @@ class RFPAnalyzer:
                 SimpleField(name="submission_deadline", type=SearchFieldDataType.String),
                 SearchableField(name="evaluation_criteria", type=SearchFieldDataType.String),
                 SimpleField(name="created_date", type=SearchFieldDataType.DateTimeOffset),
-                SearchField(name="content_vector", type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
-                           searchable=True, vector_search_dimensions=1536, vector_search_profile_name="myHnswProfile")
+                # 벡터는 반정밀도(Edm.Half)로 저장해 인덱스 크기를 절반으로 줄임
+                SearchField(name="content_vector", type=SearchFieldDataType.Collection("Edm.Half"),
+                           searchable=True, vector_search_dimensions=EMBEDDING_DIMENSIONS, vector_search_profile_name="myHnswProfile")
             ]
             
-            # Vector search 구성
+            # Vector search 구성 (HNSW 파라미터는 환경 변수로 조정 가능, 서비스 허용 범위: m 4~10, ef 100~1000)
+            hnsw_parameters = HnswParameters(
+                m=int(os.getenv("HNSW_M", "10")),
+                ef_construction=int(os.getenv("HNSW_EF_CONSTRUCTION", "400")),
+                ef_search=int(os.getenv("HNSW_EF_SEARCH", "500")),
+                metric="dotProduct"  # 저장/검색 벡터를 모두 정규화하므로 내적 = 코사인 유사도
+            )
             vector_search = VectorSearch(
                 algorithms=[
-                    HnswAlgorithmConfiguration(name="myHnsw")
+                    HnswAlgorithmConfiguration(name="myHnsw", parameters=hnsw_parameters)
+                ],
+                # HNSW 그래프는 int8로 양자화한 벡터로 구성 (원본 벡터로 재정렬)
+                compressions=[
+                    ScalarQuantizationCompression(
+                        compression_name="myScalarQuantization",
+                        parameters=ScalarQuantizationParameters(quantized_data_type="int8")
+                    )
                 ],
                 profiles=[
                     VectorSearchProfile(
                         name="myHnswProfile",
-                        algorithm_configuration_name="myHnsw"
+                        algorithm_configuration_name="myHnsw",
+                        compression_name="myScalarQuantization"
                     )
                 ]
             )
@@ -114,122 +523,412 @@ class RFPAnalyzer:
             )
             
             index_client.create_or_update_index(index)
+            
+            # 청크 인덱스 생성 (같은 벡터 검색 구성 사용)
+            chunk_fields = [
+                SimpleField(name="id", type=SearchFieldDataType.String, key=True),
+                SimpleField(name="parent_id", type=SearchFieldDataType.String, filterable=True),
+                SimpleField(name="chunk_ordinal", type=SearchFieldDataType.Int32, sortable=True),
+                SearchableField(name="chunk_text", type=SearchFieldDataType.String),
+                SearchField(name="chunk_vector", type=SearchFieldDataType.Collection("Edm.Half"),
+                           searchable=True, vector_search_dimensions=EMBEDDING_DIMENSIONS, vector_search_profile_name="myHnswProfile")
+            ]
+            chunk_index = SearchIndex(
+                name=self.chunk_index_name,
+                fields=chunk_fields,
+                vector_search=vector_search
+            )
+            
+            index_client.create_or_update_index(chunk_index)
             return True
             
         except Exception as e:
             st.error(f"❌ 인덱스 생성 오류: {str(e)}")
             return False
     
-    def get_embedding(self, text: str) -> List[float]:
+    def _embedding_cache_key(self, text: str) -> str:
+        """임베딩 캐시 키 (모델과 차원별로 키 공간을 나눠 모델 교체 시 섞이지 않게 함)"""
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"emb:{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}:{digest}"
+    
+    def _get_cached_embedding(self, key: str):
+        """캐시된 임베딩 조회 (없으면 None)"""
+        if self._embedding_cache is None:
+            return None
+        cached = self._embedding_cache.get(key)
+        return np.frombuffer(cached, dtype=np.float32).tolist() if cached is not None else None
+    
+    def _cache_embedding(self, key: str, embedding: List[float]):
+        """임베딩을 float32 바이트로 캐시에 저장 (빈 결과는 저장하지 않음)"""
+        if self._embedding_cache is not None and embedding:
+            self._embedding_cache.set(key, np.asarray(embedding, dtype=np.float32).tobytes(), expire=EMBEDDING_CACHE_TTL)
+    
+    def _normalize(self, embedding: List[float]) -> List[float]:
+        """벡터를 단위 길이로 정규화 (내적 = 코사인 유사도가 되도록, 빈 결과는 그대로)"""
+        if not embedding:
+            return embedding
+        vector = np.asarray(embedding, dtype=np.float32)
+        return (vector / (np.linalg.norm(vector) + 1e-12)).tolist()
+    
+    def get_embedding(self, text: str, use_batch: bool = False) -> List[float]:
+        """텍스트의 L2 정규화된 임베딩 벡터 생성 (같은 텍스트는 캐시에서 재사용, use_batch: _embed_chunks 참고)"""
+        key = self._embedding_cache_key(text)
+        embedding = self._get_cached_embedding(key)
+        if embedding is None:
+            embedding = self._normalize(self._create_embedding(text, use_batch))
+            self._cache_embedding(key, embedding)
+        return embedding
+    
+    def _create_embedding(self, text: str, use_batch: bool = False) -> List[float]:
         """텍스트의 임베딩 벡터 생성"""
         try:
-            # 텍스트가 너무 길 경우 청크로 나누어 처리
-            max_chunk_size = 4000  # 토큰 제한을 고려하여 4000자로 설정 (약 6000 토큰)
+            # 텍스트가 모델 입력 한도를 넘으면 토큰 단위 청크로 나누어 처리
+            chunks = self._split_text_into_chunks(text)
             
-            if len(text) <= max_chunk_size:
+            if len(chunks) <= 1:
                 # 텍스트가 짧으면 그대로 처리
                 response = self.openai_client.embeddings.create(
                     input=text,
-                    model="text-embedding-ada-002"
+                    model=EMBEDDING_MODEL
                 )
                 return response.data[0].embedding
             else:
                 # 텍스트가 길면 청크로 나누어 처리
-                st.warning(f"⚠️ 텍스트가 길어서 청크 단위로 처리합니다. (길이: {len(text)} 문자)")
-                
-                # 텍스트를 청크로 분할
-                chunks = self._split_text_into_chunks(text, max_chunk_size)
-                embeddings = []
+                st.warning(f"⚠️ 텍스트가 길어서 청크 단위로 처리합니다. (길이: {len(text)} 문자, {len(chunks)}개 청크)")
                 
-                progress_bar = st.progress(0)
-                for i, chunk in enumerate(chunks):
-                    st.write(f"   청크 {i+1}/{len(chunks)} 처리 중...")
-                    response = self.openai_client.embeddings.create(
-                        input=chunk,
-                        model="text-embedding-ada-002"
-                    )
-                    embeddings.append(response.data[0].embedding)
-                    progress_bar.progress((i + 1) / len(chunks))
+                embeddings = self._embed_chunks(chunks, use_batch=use_batch)
                 
-                # 모든 청크의 임베딩을 평균화하여 하나의 벡터로 만듦
-                if embeddings:
-                    avg_embedding = np.mean(embeddings, axis=0).tolist()
-                    return avg_embedding
-                else:
-                    return []
+                # 모든 청크의 임베딩을 길이 가중 평균하여 하나의 벡터로 만듦
+                return self._weighted_mean(embeddings, chunks)
                     
         except Exception as e:
             st.error(f"❌ 임베딩 생성 오류: {str(e)}")
             return []
     
-    def _split_text_into_chunks(self, text: str, max_chunk_size: int) -> List[str]:
-        """텍스트를 청크로 분할하는 함수"""
+    def _embed_chunks(self, chunks: List[str], chunk_tokens: int = EMBEDDING_CHUNK_TOKENS,
+                      use_batch: bool = False) -> np.ndarray:
+        """청크 목록을 임베딩 ((N, dim) float32, chunk_tokens는 청크 하나의 최대 토큰 수)
+        
+        use_batch: 오프라인 일괄 처리(bulk_mode 블록 안의 저장)에서만 True로 지정. Batch API는 완료까지 스레드를 최대
+        BATCH_POLL_TIMEOUT 동안 붙잡으므로, 화면에서 호출되는 분석·저장 경로는 항상 온라인 API를 사용합니다.
+        """
+        # 청크별 임베딩을 미리 할당한 float32 배열에 행 단위로 바로 기록
+        embeddings = np.empty((len(chunks), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        
+        # 오프라인 호출에서 청크가 아주 많으면 Batch API로 처리하고, 실패하면 온라인 API로 처리
+        filled = False
+        if use_batch and len(chunks) * chunk_tokens > BATCH_EMBEDDING_MIN_TOKENS:
+            try:
+                for i, embedding in enumerate(self.get_embeddings_batch(chunks)):
+                    embeddings[i] = embedding
+                filled = True
+            except Exception as e:
+                st.warning(f"⚠️ 배치 임베딩 실패, 온라인 API로 처리합니다: {str(e)}")
+        
+        # 청크를 한 번의 요청으로 임베딩 (요청당 입력 수/토큰 수 제한을 넘으면 나누어 요청)
+        if not filled:
+            step = self._embedding_request_size(chunk_tokens)
+            for start in range(0, len(chunks), step):
+                response = self.openai_client.embeddings.create(
+                    input=chunks[start:start + step],
+                    model=EMBEDDING_MODEL
+                )
+                for i, d in enumerate(response.data, start):
+                    embeddings[i] = d.embedding
+        
+        return embeddings
+    
+    def _embedding_request_size(self, chunk_tokens: int) -> int:
+        """임베딩 요청 하나에 넣을 청크 수 (요청당 입력 수/토큰 수 제한 이내)"""
+        return max(1, min(EMBEDDING_BATCH_SIZE, EMBEDDING_REQUEST_TOKENS // chunk_tokens))
+    
+    @_openai_retry
+    async def _create_embeddings_async(self, client, semaphore: asyncio.Semaphore, inputs: List[str]):
+        """청크 묶음 임베딩 요청 (비동기, 요청 한도 초과·타임아웃 시 지수 백오프로 재시도)"""
+        async with semaphore:
+            return await client.embeddings.create(input=inputs, model=EMBEDDING_MODEL)
+    
+    async def _embed_chunks_async(self, client, chunks: List[str],
+                                  chunk_tokens: int = EMBEDDING_CHUNK_TOKENS) -> np.ndarray:
+        """청크 목록을 임베딩 (비동기, _embed_chunks와 같은 단위로 묶어 요청하고 동시 요청 수 제한)"""
+        embeddings = np.empty((len(chunks), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        step = self._embedding_request_size(chunk_tokens)
+        starts = range(0, len(chunks), step)
+        
+        semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+        responses = await asyncio.gather(*[
+            self._create_embeddings_async(client, semaphore, chunks[start:start + step])
+            for start in starts
+        ])
+        for start, response in zip(starts, responses):
+            for i, d in enumerate(response.data, start):
+                embeddings[i] = d.embedding
+        return embeddings
+    
+    def _weighted_mean(self, embeddings: np.ndarray, chunks: List[str]) -> List[float]:
+        """청크 임베딩을 청크 길이로 가중 평균 (짧은 마지막 청크가 문서 벡터를 치우치게 하지 않도록)"""
+        weights = np.fromiter((len(chunk) for chunk in chunks), dtype=np.float32, count=len(chunks))
+        weights /= weights.sum()
+        return (weights @ embeddings).tolist()
+    
+    def _run_batch_job(self, endpoint: str, bodies: List[Dict[str, Any]], timeout: int = BATCH_POLL_TIMEOUT) -> List[Any]:
+        """Batch API로 요청을 한꺼번에 제출하고 완료될 때까지 대기
+        
+        요청 순서대로 응답 본문을 반환하며, 실패한 요청 자리에는 예외 객체를 넣습니다
+        (asyncio.gather(return_exceptions=True)와 같은 방식, 요청 하나가 실패해도 나머지 결과는 유지).
+        """
+        lines = [
+            json.dumps({"custom_id": f"req-{i}", "method": "POST", "url": endpoint, "body": body}, ensure_ascii=False)
+            for i, body in enumerate(bodies)
+        ]
+        batch_file = self.openai_client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.openai_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=endpoint,
+            completion_window="24h"
+        )
+        
+        # 완료될 때까지 간격을 두 배씩 늘려가며 상태 확인 (최대 60초 간격)
+        delay = 5
+        deadline = time.monotonic() + timeout
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.monotonic() > deadline:
+                self.openai_client.batches.cancel(batch.id)
+                raise TimeoutError(f"배치 작업이 {timeout}초 안에 끝나지 않았습니다.")
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+            batch = self.openai_client.batches.retrieve(batch.id)
+        
+        if batch.status != "completed":
+            raise RuntimeError(f"배치 작업 실패 (상태: {batch.status})")
+        
+        # 성공한 요청은 결과 파일, 실패한 요청은 오류 파일에 기록되며 순서는 보장되지 않으므로 custom_id로 다시 정렬
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.openai_client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200 and response.get("body"):
+                    results[item["custom_id"]] = response["body"]
+                else:
+                    error = item.get("error") or (response.get("body") or {}).get("error")
+                    results[item["custom_id"]] = RuntimeError(f"배치 요청 실패: {error}")
+        return [
+            results.get(f"req-{i}", RuntimeError("배치 결과에 요청의 응답이 없습니다."))
+            for i in range(len(bodies))
+        ]
+    
+    def get_embeddings_batch(self, chunks: List[str]) -> List[List[float]]:
+        """많은 청크를 Batch API로 임베딩 (청크 순서대로 벡터 반환)"""
+        bodies = [{"input": chunk, "model": EMBEDDING_MODEL} for chunk in chunks]
+        responses = self._run_batch_job("/v1/embeddings", bodies)
+        # 임베딩은 일부만 있으면 쓸 수 없으므로 실패한 요청이 있으면 전체를 실패로 처리 (호출자가 온라인 API로 처리)
+        for body in responses:
+            if isinstance(body, Exception):
+                raise body
+        return [body["data"][0]["embedding"] for body in responses]
+    
+    async def get_embedding_async(self, text: str) -> List[float]:
+        """텍스트의 L2 정규화된 임베딩 벡터 생성 (비동기, 같은 텍스트는 캐시에서 재사용)"""
+        key = self._embedding_cache_key(text)
+        embedding = self._get_cached_embedding(key)
+        if embedding is None:
+            embedding = self._normalize(await self._create_embedding_async(text))
+            self._cache_embedding(key, embedding)
+        return embedding
+    
+    async def _create_embedding_async(self, text: str) -> List[float]:
+        """텍스트의 임베딩 벡터 생성 (비동기, 긴 텍스트는 청크를 묶어서 요청)"""
+        try:
+            chunks = self._split_text_into_chunks(text)
+            
+            async with self._async_openai_client() as client:
+                embeddings = await self._embed_chunks_async(client, chunks)
+            
+            if len(chunks) == 1:
+                return embeddings[0].tolist()
+            return self._weighted_mean(embeddings, chunks)
+            
+        except Exception as e:
+            st.error(f"❌ 임베딩 생성 오류: {str(e)}")
+            return []
+    
+    def embed_texts(self, texts: List[str]):
+        """여러 질문을 한 번의 요청으로 임베딩 ((N, dim) float32, 행마다 L2 정규화)"""
+        try:
+            response = self.openai_client.embeddings.create(
+                input=texts,
+                model=QA_EMBEDDING_MODEL
+            )
+            embeddings = np.asarray([d.embedding for d in response.data], dtype=np.float32)
+            return embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12)
+        except Exception as e:
+            st.warning(f"⚠️ 질문 임베딩 생성 오류: {str(e)}")
+            return None
+    
+    def get_question_embedding(self, question: str):
+        """질문 임베딩 생성 (L2 정규화된 float32 벡터)"""
+        embeddings = self.embed_texts([question])
+        return embeddings[0] if embeddings is not None else None
+    
+    def _split_text_into_chunks(self, text: str, max_tokens: int = EMBEDDING_CHUNK_TOKENS) -> List[str]:
+        """텍스트를 임베딩 모델의 토큰 기준으로 최대 max_tokens개씩 나눈 청크 목록"""
+        encoding = _encoding(EMBEDDING_MODEL)
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return [text]
+        
+        # 글자 중간에서 자르지 않도록 청크 경계를 글자 단위로 맞춤
         chunks = []
+        start = 0
+        while start < len(tokens):
+            end = _char_boundary(encoding, tokens, start, min(start + max_tokens, len(tokens)))
+            chunks.append(encoding.decode(tokens[start:end]))
+            start = end
+        return chunks
+    
+    def extract_title(self, file, file_name: str = None) -> str:
+        """파일 제목 추출 (본문 전체를 읽지 않고 메타데이터/첫 단락/첫 줄만 확인)
         
-        # 문장 단위로 분할을 시도
-        sentences = text.split('. ')
-        current_chunk = ""
+        file은 파일 경로 또는 바이너리 파일 객체이며, 파일 객체인 경우 file_name으로 형식을 판단합니다.
+        """
+        file_name = file_name or file
+        file_extension = os.path.splitext(file_name)[1].lower()
+        title = None
         
-        for sentence in sentences:
-            # 현재 청크에 문장을 추가했을 때의 길이 확인
-            test_chunk = current_chunk + sentence + ". " if current_chunk else sentence + ". "
+        try:
+            if file_extension == ".pdf":
+                # PDF 제목 추출 시도 (문서 정보 사전만 읽음)
+                title = self._pdf_title(file)
             
-            if len(test_chunk) <= max_chunk_size:
-                current_chunk = test_chunk
-            else:
-                # 현재 청크가 비어있지 않으면 저장
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = sentence + ". "
+            elif file_extension == ".docx":
+                # DOCX 제목 추출 시도 (첫 번째 단락을 제목으로 사용)
+                first_paragraph = next(_iter_docx_paragraphs(file), "").strip()
+                if first_paragraph and len(first_paragraph) < 100:  # 너무 길면 제목이 아닐 가능성
+                    title = first_paragraph
+            
+            elif file_extension == ".txt":
+                # TXT 제목 추출 시도 (첫 번째 줄을 제목으로 사용)
+                if isinstance(file, str):
+                    with open(file, 'rb') as f:
+                        first_line = f.readline()
                 else:
-                    # 문장 자체가 너무 긴 경우 강제로 자름
-                    if len(sentence) > max_chunk_size:
-                        # 문장을 단어 단위로 자름
-                        words = sentence.split()
-                        temp_chunk = ""
-                        
-                        for word in words:
-                            if len(temp_chunk + " " + word) <= max_chunk_size:
-                                temp_chunk += " " + word if temp_chunk else word
-                            else:
-                                if temp_chunk:
-                                    chunks.append(temp_chunk.strip())
-                                temp_chunk = word
-                        
-                        if temp_chunk:
-                            current_chunk = temp_chunk + ". "
-                    else:
-                        current_chunk = sentence + ". "
-        
-        # 마지막 청크 추가
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        # 각 청크의 크기를 다시 확인하고 필요시 추가 분할
-        final_chunks = []
-        for chunk in chunks:
-            if len(chunk) <= max_chunk_size:
-                final_chunks.append(chunk)
-            else:
-                # 청크가 여전히 크면 추가로 분할
-                words = chunk.split()
-                temp_chunk = ""
-                
-                for word in words:
-                    if len(temp_chunk + " " + word) <= max_chunk_size:
-                        temp_chunk += " " + word if temp_chunk else word
-                    else:
-                        if temp_chunk:
-                            final_chunks.append(temp_chunk.strip())
-                        temp_chunk = word
-                
-                if temp_chunk:
-                    final_chunks.append(temp_chunk.strip())
+                    first_line = file.readline()
+                first_line = first_line.decode('utf-8', errors='ignore').strip()
+                if first_line and len(first_line) < 100:  # 너무 길면 제목이 아닐 가능성
+                    title = first_line
+        except Exception:
+            pass
+        finally:
+            if not isinstance(file, str):
+                file.seek(0)
         
-        return final_chunks
+        # 제목이 없으면 파일명 사용
+        return title or os.path.splitext(os.path.basename(file_name))[0]
     
-    def extract_text_from_file(self, file_path):
-        """파일에서 텍스트 추출"""
+    def _pdf_pages_to_process(self, total_pages: int) -> int:
+        """텍스트를 추출할 페이지 수 (최대 MAX_PDF_PAGES)"""
+        st.info(f"📄 PDF 페이지 수: {total_pages}")
+        if total_pages > MAX_PDF_PAGES:
+            st.warning(f"⚠️ PDF 페이지 수가 {MAX_PDF_PAGES}페이지를 초과합니다. 처음 {MAX_PDF_PAGES}페이지만 처리합니다.")
+            return MAX_PDF_PAGES
+        return total_pages
+    
+    def _pdf_title(self, file):
+        """PDF 메타데이터의 제목 (없으면 None)"""
+        if pdfium is not None:
+            try:
+                pdf = pdfium.PdfDocument(file)
+                try:
+                    return (pdf.get_metadata_dict().get("Title") or "").strip() or None
+                finally:
+                    pdf.close()
+            except Exception:
+                if not isinstance(file, str):
+                    file.seek(0)
+        
+        # pypdfium2로 읽지 못한 경우에만 PyPDF2를 불러옴
+        import PyPDF2
+        
+        metadata = PyPDF2.PdfReader(file).metadata
+        if metadata and metadata.title:
+            return metadata.title.strip()
+        return None
+    
+    def _extract_pdf_pages_pdfium(self, file_path: str):
+        """pypdfium2로 페이지 텍스트 추출 -> (페이지 텍스트 목록, 처리한 페이지 수, 전체 페이지 수)
+        
+        PDFium은 스레드 안전하지 않으므로 한 문서를 순서대로 처리합니다.
+        """
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            total_pages = len(pdf)
+            pages_to_process = self._pdf_pages_to_process(total_pages)
+            
+            page_texts = []
+            progress_bar = st.progress(0)
+            for i in range(pages_to_process):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                try:
+                    page_text = textpage.get_text_range().replace("\r\n", "\n")
+                finally:
+                    textpage.close()
+                    page.close()
+                if page_text:
+                    page_texts.append(page_text + "\n")
+                progress_bar.progress((i + 1) / pages_to_process)
+            
+            return page_texts, pages_to_process, total_pages
+        finally:
+            pdf.close()
+    
+    def _extract_pdf_pages_pypdf2(self, file_path: str):
+        """PyPDF2로 페이지 텍스트 추출 -> (페이지 텍스트 목록, 처리한 페이지 수, 전체 페이지 수)"""
+        import PyPDF2
+        
+        with _open_pdf(file_path) as file:
+            total_pages = len(PyPDF2.PdfReader(file).pages)
+        pages_to_process = self._pdf_pages_to_process(total_pages)
+        
+        # 페이지 범위를 나누어 여러 프로세스에서 동시에 추출 (페이지가 적으면 현재 프로세스에서 처리)
+        workers = min(os.cpu_count() or 1, pages_to_process) if pages_to_process >= PDF_PARALLEL_MIN_PAGES else 1
+        step = -(-pages_to_process // workers)
+        ranges = [(file_path, start, min(start + step, pages_to_process))
+                  for start in range(0, pages_to_process, step)]
+        
+        # 페이지 텍스트는 리스트에 모았다가 마지막에 한 번만 합침
+        page_texts = []
+        progress_bar = st.progress(0)
+        # Streamlit 서버는 여러 스레드와 연결 풀을 가진 채 실행되므로 fork 대신 spawn으로 작업 프로세스 생성
+        # (스레드가 잡고 있던 락이 복사된 채 fork되면 자식 프로세스가 멈출 수 있음)
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) if workers > 1 else None
+        try:
+            results = executor.map(_extract_pdf_pages, ranges) if executor else map(_extract_pdf_pages, ranges)
+            for (_, start, end), range_results in zip(ranges, results):
+                for i, (page_text, page_error) in enumerate(range_results, start):
+                    if page_error:
+                        st.warning(f"   페이지 {i+1} 처리 오류: {page_error}")
+                    elif page_text:
+                        page_texts.append(page_text + "\n")
+                progress_bar.progress(end / pages_to_process)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        return page_texts, pages_to_process, total_pages
+    
+    def extract_text(self, file_path):
+        """파일에서 본문 텍스트 추출 (실패 시 None)"""
         try:
             # 파일 경로 정규화 및 존재 확인
             file_path = os.path.abspath(file_path)
@@ -237,11 +936,11 @@ class RFPAnalyzer:
             
             if not os.path.exists(file_path):
                 st.error(f"❌ 파일이 존재하지 않습니다: {file_path}")
-                return None, None
+                return None
             
             if not os.path.isfile(file_path):
                 st.error(f"❌ 경로가 파일이 아닙니다: {file_path}")
-                return None, None
+                return None
             
             # 파일 크기 확인
             file_size = os.path.getsize(file_path)
@@ -249,136 +948,97 @@ class RFPAnalyzer:
             
             if file_size == 0:
                 st.error("❌ 파일이 비어있습니다.")
-                return None, None
+                return None
             
             file_extension = os.path.splitext(file_path)[1].lower()
             st.info(f"📄 파일 확장자: {file_extension}")
             
             if file_extension == ".pdf":
                 st.info("📖 PDF 파일 처리 중...")
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    total_pages = len(pdf_reader.pages)
-                    st.info(f"📄 PDF 페이지 수: {total_pages}")
-                    
-                    # PDF 제목 추출 시도
-                    pdf_title = None
+                
+                # PDFium(C++)으로 추출하고, 실패하면 PyPDF2로 다시 시도
+                page_texts = None
+                if pdfium is not None:
                     try:
-                        if pdf_reader.metadata and pdf_reader.metadata.title:
-                            pdf_title = pdf_reader.metadata.title.strip()
-                            st.info(f"📋 PDF 제목: {pdf_title}")
-                    except:
-                        pass
-                    
-                    # 제목이 없으면 파일명 사용
-                    if not pdf_title:
-                        pdf_title = os.path.splitext(os.path.basename(file_path))[0]
-                        st.info(f"📋 파일명을 제목으로 사용: {pdf_title}")
-                    
-                    # 페이지 수 제한 (200페이지)
-                    max_pages = 200
-                    if total_pages > max_pages:
-                        st.warning(f"⚠️ PDF 페이지 수가 {max_pages}페이지를 초과합니다. 처음 {max_pages}페이지만 처리합니다.")
-                        pages_to_process = max_pages
-                    else:
-                        pages_to_process = total_pages
-                    
-                    text = ""
-                    progress_bar = st.progress(0)
-                    for i in range(pages_to_process):
-                        try:
-                            page = pdf_reader.pages[i]
-                            page_text = page.extract_text()
-                            if page_text:
-                                text += page_text + "\n"
-                            # st.write(f"   페이지 {i+1} 처리 완료")
-                            progress_bar.progress((i + 1) / pages_to_process)
-                        except Exception as page_error:
-                            st.warning(f"   페이지 {i+1} 처리 오류: {str(page_error)}")
-                            continue
-                    
-                    if not text.strip():
-                        st.error("❌ PDF에서 텍스트를 추출할 수 없습니다.")
-                        return None, None
-                    
-                    st.success(f"✅ PDF 텍스트 추출 완료: {len(text)} 문자 (처리된 페이지: {pages_to_process}/{total_pages})")
-                    return text, pdf_title
+                        page_texts, pages_to_process, total_pages = self._extract_pdf_pages_pdfium(file_path)
+                    except Exception as pdfium_error:
+                        st.warning(f"⚠️ pypdfium2 추출 실패, PyPDF2로 다시 시도합니다: {str(pdfium_error)}")
+                if page_texts is None:
+                    page_texts, pages_to_process, total_pages = self._extract_pdf_pages_pypdf2(file_path)
+                
+                text = "".join(page_texts)
+                if not text.strip():
+                    st.error("❌ PDF에서 텍스트를 추출할 수 없습니다.")
+                    return None
+                
+                st.success(f"✅ PDF 텍스트 추출 완료: {len(text)} 문자 (처리된 페이지: {pages_to_process}/{total_pages})")
+                return text
             
             elif file_extension == ".docx":
                 st.info("📝 DOCX 파일 처리 중...")
-                doc = docx.Document(file_path)
-                st.info(f"📄 DOCX 단락 수: {len(doc.paragraphs)}")
-                
-                # DOCX 제목 추출 시도 (첫 번째 단락을 제목으로 사용)
-                docx_title = None
-                if doc.paragraphs:
-                    first_paragraph = doc.paragraphs[0].text.strip()
-                    if first_paragraph and len(first_paragraph) < 100:  # 너무 길면 제목이 아닐 가능성
-                        docx_title = first_paragraph
-                        st.info(f"📋 DOCX 제목: {docx_title}")
+                paragraph_count = 0
+                paragraphs = []
+                for paragraph in _iter_docx_paragraphs(file_path):
+                    paragraph_count += 1
+                    if paragraph.strip():
+                        paragraphs.append(paragraph + "\n")
+                st.info(f"📄 DOCX 단락 수: {paragraph_count}")
                 
-                # 제목이 없으면 파일명 사용
-                if not docx_title:
-                    docx_title = os.path.splitext(os.path.basename(file_path))[0]
-                    st.info(f"📋 파일명을 제목으로 사용: {docx_title}")
-                
-                text = ""
-                for i, paragraph in enumerate(doc.paragraphs):
-                    if paragraph.text.strip():
-                        text += paragraph.text + "\n"
+                text = "".join(paragraphs)
                 
                 if not text.strip():
                     st.error("❌ DOCX에서 텍스트를 추출할 수 없습니다.")
-                    return None, None
+                    return None
                 
                 st.success(f"✅ DOCX 텍스트 추출 완료: {len(text)} 문자")
-                return text, docx_title
+                return text
             
             elif file_extension == ".txt":
                 st.info("📄 TXT 파일 처리 중...")
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
+                # 메모리 맵에서 바로 디코딩 (중간 bytes 사본 없이 str 하나만 생성)
+                with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    content = str(mm, 'utf-8')
+                    if "\r" in content:
+                        content = content.replace("\r\n", "\n")
                     if not content.strip():
                         st.error("❌ TXT 파일이 비어있습니다.")
-                        return None, None
-                    
-                    # TXT 제목 추출 시도 (첫 번째 줄을 제목으로 사용)
-                    txt_title = None
-                    first_line = content.split('\n')[0].strip()
-                    if first_line and len(first_line) < 100:  # 너무 길면 제목이 아닐 가능성
-                        txt_title = first_line
-                        st.info(f"📋 TXT 제목: {txt_title}")
-                    
-                    # 제목이 없으면 파일명 사용
-                    if not txt_title:
-                        txt_title = os.path.splitext(os.path.basename(file_path))[0]
-                        st.info(f"📋 파일명을 제목으로 사용: {txt_title}")
+                        return None
                     
                     st.success(f"✅ TXT 텍스트 추출 완료: {len(content)} 문자")
-                    return content, txt_title
+                    return content
             
             else:
                 st.error(f"❌ 지원하지 않는 파일 형식입니다: {file_extension}")
                 st.info("   지원 형식: .pdf, .docx, .txt")
-                return None, None
+                return None
                 
         except FileNotFoundError as e:
             st.error(f"❌ 파일을 찾을 수 없습니다: {str(e)}")
-            return None, None
+            return None
         except PermissionError as e:
             st.error(f"❌ 파일 접근 권한이 없습니다: {str(e)}")
-            return None, None
+            return None
         except UnicodeDecodeError as e:
             st.error(f"❌ 파일 인코딩 오류: {str(e)}")
             st.info("   다른 인코딩으로 시도해보세요.")
-            return None, None
+            return None
         except Exception as e:
             st.error(f"❌ 파일 텍스트 추출 오류: {str(e)}")
             st.info(f"   오류 타입: {type(e).__name__}")
+            return None
+    
+    def extract_text_from_file(self, file_path):
+        """파일에서 텍스트와 제목 추출"""
+        text = self.extract_text(file_path)
+        if not text:
             return None, None
+        
+        title = self.extract_title(file_path)
+        st.info(f"📋 문서 제목: {title}")
+        return text, title
     
-    def analyze_rfp_with_gpt(self, rfp_content: str) -> Dict[str, Any]:
-        """GPT-4를 사용하여 RFP 내용 분석"""
+    def _build_analysis_messages(self, rfp_content: str) -> List[Dict[str, str]]:
+        """RFP 분석 프롬프트 메시지 구성"""
         prompt = f"""
         RFP 내용을 11개 카테고리별로 분석하세요:
         
@@ -518,83 +1178,113 @@ class RFPAnalyzer:
         }}
         """
         
+        return [
+            {"role": "system", "content": "당신은 RFP 분석 전문가입니다. 주어진 RFP 문서를 정확하게 분석하여 구조화된 정보를 추출합니다."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _parse_analysis_response(self, content: str) -> Dict[str, Any]:
+        """GPT 응답에서 JSON 분석 결과 추출"""
+        # JSON 모드 응답은 그대로 파싱
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            pass
+        
+        # 코드 블록 등으로 감싸진 경우 본문에서 JSON 객체를 찾아 파싱
+        json_match = _JSON_RE.search(content)
+        if json_match:
+            return json.loads(json_match.group())
+        else:
+            st.error("❌ GPT 응답에서 JSON을 찾을 수 없습니다.")
+            return {}
+    
+    def analyze_rfp_with_gpt(self, rfp_content: str) -> Dict[str, Any]:
+        """GPT-4를 사용하여 RFP 내용 분석"""
         try:
             response = self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "당신은 RFP 분석 전문가입니다. 주어진 RFP 문서를 정확하게 분석하여 구조화된 정보를 추출합니다."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._build_analysis_messages(rfp_content),
                 temperature=0.3,
-                max_tokens=2000
+                max_tokens=2000,
+                response_format={"type": "json_object"}
             )
             
-            content = response.choices[0].message.content
-            # JSON 추출
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                st.error("❌ GPT 응답에서 JSON을 찾을 수 없습니다.")
-                return {}
+            return self._parse_analysis_response(response.choices[0].message.content)
                 
         except Exception as e:
             st.error(f"❌ RFP 분석 오류: {str(e)}")
             return {}
     
-    def store_rfp_in_search(self, rfp_analysis: Dict[str, Any], rfp_content: str, pdf_title: str = None):
-        """분석된 RFP를 Azure AI Search에 저장"""
+    async def analyze_rfp_with_gpt_async(self, rfp_content: str) -> Dict[str, Any]:
+        """GPT-4를 사용하여 RFP 내용 분석 (비동기)"""
+        try:
+            async with self._async_openai_client() as client:
+                response = await client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._build_analysis_messages(rfp_content),
+                    temperature=0.3,
+                    max_tokens=2000,
+                    response_format={"type": "json_object"}
+                )
+            
+            return self._parse_analysis_response(response.choices[0].message.content)
+                
+        except Exception as e:
+            st.error(f"❌ RFP 분석 오류: {str(e)}")
+            return {}
+    
+    def store_rfp_in_search(self, rfp_analysis: Dict[str, Any], rfp_content: str, pdf_title: str = None,
+                            content_vector: List[float] = None, flush: bool = True, warnings: List[str] = None,
+                            raise_errors: bool = False):
+        """분석된 RFP를 Azure AI Search에 저장
+        
+        content_vector를 주면 (분석과 동시에 미리 계산한) 해당 임베딩을 그대로 사용합니다.
+        flush=False이면 문서를 현재 스레드의 대기열에 넣고, SEARCH_UPLOAD_BATCH_SIZE개가 모이거나 같은 스레드에서 finalize()를 호출할 때 한 번에 업로드합니다.
+        본문 청크는 문서와 함께 대기열에 넣었다가 문서 업로드에 성공한 뒤에만 청크 인덱스에 업로드합니다.
+        warnings에 리스트를 주면 청크 인덱스 저장 실패(문서 저장은 성공) 사유를 st.warning 대신 리스트에 추가합니다
+        (백그라운드 스레드에서 호출할 때 사용).
+        raise_errors=True이면 저장 오류를 st.error로 표시하지 않고 예외로 발생시킵니다 (호출자가 오류 내용을 표시).
+        """
         try:
-            # 임베딩 벡터 생성
-            content_vector = self.get_embedding(rfp_content)
+            # 대량 적재(bulk_mode) 중에는 긴 본문의 임베딩을 Batch API로 처리 (화면에서 호출되는 저장은 온라인 API)
+            use_batch = self._in_bulk_mode()
+            
+            # 임베딩 벡터 생성 (미리 계산된 값이 없을 때만)
+            if not content_vector:
+                content_vector = self.get_embedding(rfp_content, use_batch)
             
             # PDF 제목 추출 (우선순위: 전달받은 pdf_title > 프로젝트 개요 > 기본값)
             if pdf_title:
                 document_title = pdf_title
             else:
-                project_overview = ""
-                if "1_핵심개요" in rfp_analysis:
-                    core_overview = rfp_analysis["1_핵심개요"]
-                    project_overview = f"{core_overview.get('배경목적', '')} {core_overview.get('기대성과', '')}".strip()
+                core_overview = rfp_analysis.get("1_핵심개요") or {}
+                project_overview = f"{core_overview.get('배경목적', '')} {core_overview.get('기대성과', '')}".strip()
                 document_title = project_overview[:100] if project_overview else "RFP Document"
             
             # 예산 범위 추출
-            budget_range = ""
-            if "3_예산가격" in rfp_analysis:
-                budget_info = rfp_analysis["3_예산가격"]
-                budget_range = budget_info.get("추정예산", "")
+            budget_range = (rfp_analysis.get("3_예산가격") or {}).get("추정예산", "")
             
             # 제출 마감일 추출
-            submission_deadline = ""
-            if "2_일정마일스톤" in rfp_analysis:
-                schedule_info = rfp_analysis["2_일정마일스톤"]
-                submission_deadline = schedule_info.get("질의응답마감", "")
-            
-            # 기술 요구사항 추출
-            technical_requirements = []
-            if "5_요구사항" in rfp_analysis:
-                requirements_info = rfp_analysis["5_요구사항"]
-                technical_requirements = [
-                    requirements_info.get("기능요구", ""),
-                    requirements_info.get("비기능요구", ""),
-                    requirements_info.get("인터페이스연계", ""),
-                    requirements_info.get("데이터", ""),
-                    requirements_info.get("호환성표준", "")
-                ]
-                technical_requirements = [req for req in technical_requirements if req]
+            submission_deadline = (rfp_analysis.get("2_일정마일스톤") or {}).get("질의응답마감", "")
+            
+            # 기술 요구사항 추출 (값이 있는 항목만)
+            requirements_info = rfp_analysis.get("5_요구사항") or {}
+            technical_requirements = [
+                requirement
+                for key in ("기능요구", "비기능요구", "인터페이스연계", "데이터", "호환성표준")
+                if (requirement := requirements_info.get(key))
+            ]
             
             # 평가 기준 추출
             evaluation_criteria = {}
-            if "4_평가선정기준" in rfp_analysis:
-                eval_info = rfp_analysis["4_평가선정기준"]
+            if (eval_info := rfp_analysis.get("4_평가선정기준")) is not None:
                 evaluation_criteria = {
-                    "정량정성배점": eval_info.get("정량정성배점", ""),
-                    "가점감점요건": eval_info.get("가점감점요건", ""),
-                    "탈락필수요건": eval_info.get("탈락필수요건", "")
+                    key: eval_info.get(key, "") for key in ("정량정성배점", "가점감점요건", "탈락필수요건")
                 }
             
             document = {
-                "id": f"rfp_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                "id": f"rfp_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}",
                 "title": document_title,
                 "content": rfp_content,
                 "requirements": json.dumps(technical_requirements, ensure_ascii=False),
@@ -606,13 +1296,154 @@ class RFPAnalyzer:
                 "content_vector": content_vector
             }
             
-            result = self.search_client.upload_documents([document])
-            return len(result) > 0
+            # 본문을 단락 크기 청크로 나누어 청크 인덱스용 문서 생성 (실패해도 문서 저장은 계속)
+            chunk_docs = self._build_chunk_docs(document["id"], rfp_content, use_batch, warnings)
+            
+            pending = self._pending_entries()
+            pending.append((document, chunk_docs, warnings))
+            if (use_batch or not flush) and len(pending) < SEARCH_UPLOAD_BATCH_SIZE:
+                return True
+            
+            return self._upload_pending(self._take_pending_entries(), raise_errors)
             
         except Exception as e:
+            if raise_errors:
+                raise
             st.error(f"❌ RFP 저장 오류: {str(e)}")
             return False
     
+    def _build_chunk_docs(self, parent_id: str, rfp_content: str, use_batch: bool = False,
+                          warnings: List[str] = None) -> List[Dict[str, Any]]:
+        """RFP 본문을 SEARCH_CHUNK_TOKENS 크기 청크로 나누어 청크별 임베딩을 붙인 청크 인덱스 문서 목록 (실패하면 빈 목록)"""
+        try:
+            chunks = self._split_text_into_chunks(rfp_content, SEARCH_CHUNK_TOKENS)
+            embeddings = self._embed_chunks(chunks, SEARCH_CHUNK_TOKENS, use_batch)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+            
+            return [
+                {
+                    "id": f"{parent_id}_chunk_{i}",
+                    "parent_id": parent_id,
+                    "chunk_ordinal": i,
+                    "chunk_text": chunk,
+                    "chunk_vector": embedding.tolist()
+                }
+                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+            ]
+            
+        except Exception as e:
+            self._report_warning(warnings, f"RFP 청크 생성 오류: {str(e)}")
+            return []
+    
+    def _report_warning(self, warnings: List[str], message: str):
+        """경고를 warnings에 추가 (warnings가 None이면 바로 st.warning으로 표시)"""
+        if warnings is None:
+            st.warning(f"⚠️ {message}")
+        else:
+            warnings.append(message)
+    
+    def _upload_pending(self, entries, raise_errors: bool = False) -> bool:
+        """(문서, 청크 문서 목록, 경고 목록)을 업로드 - 문서를 먼저 올리고, 업로드에 성공한 문서의 청크만 청크 인덱스에 업로드
+        
+        부모 문서 없이 청크만 남으면 청크 검색 결과가 존재하지 않는 문서를 가리키게 되므로 순서를 지킵니다.
+        청크 저장에 실패한 문서는 해당 문서를 저장한 호출자의 경고 목록에 사유를 남깁니다.
+        raise_errors=True이면 문서 저장 오류를 (성공한 문서의 청크를 올린 뒤) 예외로 발생시킵니다.
+        """
+        docs = [document for document, *_ in entries]
+        stored = set()
+        error = None
+        try:
+            for start in range(0, len(docs), SEARCH_UPLOAD_BATCH_SIZE):
+                results = self.search_client.upload_documents(docs[start:start + SEARCH_UPLOAD_BATCH_SIZE])
+                stored.update(result.key for result in results if result.succeeded)
+                failed = [result for result in results if not result.succeeded]
+                if failed and error is None:
+                    error = RuntimeError(f"문서 {len(failed)}건 업로드 실패 ({failed[0].error_message})")
+        except Exception as e:
+            error = e
+        
+        chunk_entries = [(document, chunks, warnings) for document, chunks, warnings in entries
+                         if document["id"] in stored and chunks]
+        failed_parents = {}  # 부모 문서 id -> 청크 저장 오류 메시지
+        for document, chunks, _ in chunk_entries:
+            try:
+                for start in range(0, len(chunks), SEARCH_UPLOAD_BATCH_SIZE):
+                    results = self.chunk_search_client.upload_documents(chunks[start:start + SEARCH_UPLOAD_BATCH_SIZE])
+                    failed = [result for result in results if not result.succeeded]
+                    if failed:
+                        failed_parents[document["id"]] = f"청크 {len(failed)}개 업로드 실패 ({failed[0].error_message})"
+            except Exception as e:
+                failed_parents[document["id"]] = str(e)
+        
+        for document, _, warnings in chunk_entries:
+            if document["id"] in failed_parents:
+                self._report_warning(
+                    warnings,
+                    f"'{document['title']}' RFP 청크 저장 오류: {failed_parents[document['id']]} "
+                    "(유사 RFP 검색은 문서 단위로 수행됩니다)"
+                )
+        
+        if error is not None:
+            if raise_errors:
+                raise error
+            st.error(f"❌ RFP 일괄 저장 오류: {str(error)}")
+        return error is None and len(stored) == len(docs)
+    
+    def _upload_in_batches(self, search_client, docs: List[Dict[str, Any]]) -> bool:
+        """문서를 SEARCH_UPLOAD_BATCH_SIZE개씩 나누어 업로드 (모두 성공하면 True)"""
+        succeeded = True
+        for start in range(0, len(docs), SEARCH_UPLOAD_BATCH_SIZE):
+            results = search_client.upload_documents(docs[start:start + SEARCH_UPLOAD_BATCH_SIZE])
+            succeeded = succeeded and all(result.succeeded for result in results)
+        return succeeded
+    
+    def store_rfp_batch(self, docs: List[Dict[str, Any]]) -> bool:
+        """여러 문서를 SEARCH_UPLOAD_BATCH_SIZE개씩 나누어 업로드 (모두 성공하면 True)"""
+        try:
+            return self._upload_in_batches(self.search_client, docs)
+            
+        except Exception as e:
+            st.error(f"❌ RFP 일괄 저장 오류: {str(e)}")
+            return False
+    
+    def finalize(self) -> bool:
+        """현재 스레드의 대기열에 남은 문서를 모두 업로드 (다른 스레드가 모은 문서는 그 스레드가 업로드)"""
+        entries = self._take_pending_entries()
+        return self._upload_pending(entries) if entries else True
+    
+    def _pending_entries(self) -> list:
+        """현재 스레드의 업로드 대기열"""
+        if not hasattr(self._bulk_state, "pending"):
+            self._bulk_state.pending = []
+        return self._bulk_state.pending
+    
+    def _take_pending_entries(self) -> list:
+        """현재 스레드의 업로드 대기열을 비우고 들어 있던 항목을 반환"""
+        entries = self._pending_entries()
+        self._bulk_state.pending = []
+        return entries
+    
+    def _in_bulk_mode(self) -> bool:
+        """현재 스레드가 bulk_mode 블록 안에 있는지"""
+        return getattr(self._bulk_state, "depth", 0) > 0
+    
+    @contextmanager
+    def bulk_mode(self):
+        """대량 적재 모드 - 블록 안의 store_rfp_in_search 호출을 모았다가 SEARCH_UPLOAD_BATCH_SIZE개씩 업로드
+        
+        긴 본문의 임베딩은 Batch API로 처리하고, 가장 바깥 블록이 끝나면 남은 문서를 업로드합니다.
+        대기열과 블록 여부는 모두 스레드별로 관리하므로 다른 세션의 저장 호출은 평소처럼 바로 업로드되고,
+        블록이 끝날 때도 이 스레드가 모은 문서만 업로드합니다.
+        (Azure AI Search는 기존 인덱스의 벡터 필드 프로필을 바꿀 수 없으므로 HNSW 구성 자체는 그대로 둡니다.)
+        """
+        self._bulk_state.depth = getattr(self._bulk_state, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            self._bulk_state.depth -= 1
+            if not self._in_bulk_mode():
+                self.finalize()
+    
     def search_similar_rfps(self, current_rfp_keywords: List[str], limit: int = 5):
         """유사한 RFP 검색"""
         try:
@@ -625,71 +1456,174 @@ class RFPAnalyzer:
             if not query_vector:
                 return []
             
+            # 청크 인덱스에서 먼저 검색 (청크 인덱스가 없거나 비어 있으면 문서 인덱스에서 검색)
+            similar_rfps = self._search_similar_chunks(search_query, query_vector, limit)
+            if similar_rfps:
+                return similar_rfps
+            
             # 벡터 검색 수행
             vector_query = VectorizedQuery(vector=query_vector, k_nearest_neighbors=limit, fields="content_vector")
             
             results = self.search_client.search(
                 search_text=search_query,
                 vector_queries=[vector_query],
-                select=["title", "project_type", "requirements", "evaluation_criteria", "created_date"],
+                select=SIMILAR_RFP_FIELDS,
                 top=limit
             )
             
-            similar_rfps = []
-            for result in results:
-                similar_rfps.append({
-                    "title": result["title"],
-                    "project_type": result["project_type"],
-                    "requirements": result["requirements"],
-                    "evaluation_criteria": result["evaluation_criteria"],
-                    "created_date": result["created_date"],
-                    "score": result.get("@search.score", 0)
-                })
-            
-            return similar_rfps
+            return [self._to_similar_rfp(result) for result in results]
             
         except Exception as e:
             st.error(f"❌ 유사 RFP 검색 오류: {str(e)}")
             return []
     
-    def ask_question_about_rfp(self, question: str, rfp_content: str, rfp_analysis: Dict[str, Any] = None) -> str:
-        """RFP 내용에 대한 질의응답"""
+    async def search_similar_rfps_async(self, current_rfp_keywords: List[str], limit: int = 5):
+        """유사한 RFP 검색 (비동기)"""
         try:
-            # RFP 분석 결과가 있으면 구조화된 정보도 포함
-            analysis_context = ""
-            if rfp_analysis:
-                analysis_context = f"""
-                
-                RFP 분석 결과:
-                {json.dumps(rfp_analysis, ensure_ascii=False, indent=2)}
-                """
+            search_query = " ".join(current_rfp_keywords)
             
-            prompt = f"""
-            RFP 문서 내용을 바탕으로 질문에 답변해주세요.
+            query_vector = await self.get_embedding_async(search_query)
             
-            RFP 내용:
-            {rfp_content[:3000]}  # 토큰 제한을 고려하여 3000자로 제한
+            if not query_vector:
+                return []
             
-            {analysis_context}
+            similar_rfps = await self._search_similar_chunks_async(search_query, query_vector, limit)
+            if similar_rfps:
+                return similar_rfps
             
-            사용자 질문: {question}
+            vector_query = VectorizedQuery(vector=query_vector, k_nearest_neighbors=limit, fields="content_vector")
             
-            답변 지침:
-            1. RFP 문서에서 직접 찾을 수 있는 정보를 우선 제공
-            2. 구체적인 수치, 조건, 일정 등 정확히 명시
-            3. 관련 조항이나 섹션 참조
-            4. 정보가 명확하지 않으면 "문서에서 명확한 정보를 찾을 수 없습니다" 표시
-            5. 한국어로 간결하게 답변
+            async with self._async_search_client() as search_client:
+                results = await search_client.search(
+                    search_text=search_query,
+                    vector_queries=[vector_query],
+                    select=SIMILAR_RFP_FIELDS,
+                    top=limit
+                )
+                return [self._to_similar_rfp(result) async for result in results]
             
-            답변:
-            """
+        except Exception as e:
+            st.error(f"❌ 유사 RFP 검색 오류: {str(e)}")
+            return []
+    
+    def _search_similar_chunks(self, search_query: str, query_vector: List[float], limit: int):
+        """청크 인덱스 검색 결과를 부모 문서별로 모아 유사 RFP 목록 생성 (실패하면 빈 목록)"""
+        try:
+            k = limit * CHUNK_SEARCH_OVERSAMPLE
+            vector_query = VectorizedQuery(vector=query_vector, k_nearest_neighbors=k, fields="chunk_vector")
+            results = self.chunk_search_client.search(
+                search_text=search_query,
+                vector_queries=[vector_query],
+                select=["parent_id"],
+                top=k
+            )
+            
+            parent_scores = self._top_parents(results, limit)
+            similar_rfps = []
+            for parent_id, score in parent_scores.items():
+                # 부모 문서가 없는 청크(저장 실패 등)는 건너뜀
+                try:
+                    document = self.search_client.get_document(key=parent_id, selected_fields=SIMILAR_RFP_FIELDS)
+                except ResourceNotFoundError:
+                    continue
+                similar_rfps.append(self._to_similar_rfp(document, score))
+            return similar_rfps
+        except Exception:
+            return []
+    
+    async def _search_similar_chunks_async(self, search_query: str, query_vector: List[float], limit: int):
+        """청크 인덱스 검색 결과를 부모 문서별로 모아 유사 RFP 목록 생성 (비동기, 실패하면 빈 목록)"""
+        try:
+            k = limit * CHUNK_SEARCH_OVERSAMPLE
+            vector_query = VectorizedQuery(vector=query_vector, k_nearest_neighbors=k, fields="chunk_vector")
+            async with self._async_search_client(self.chunk_index_name) as chunk_client:
+                results = await chunk_client.search(
+                    search_text=search_query,
+                    vector_queries=[vector_query],
+                    select=["parent_id"],
+                    top=k
+                )
+                parent_scores = self._top_parents([result async for result in results], limit)
             
+            # 부모 문서는 동시에 조회 (부모 문서가 없는 청크는 건너뜀)
+            async with self._async_search_client() as search_client:
+                documents = await asyncio.gather(*[
+                    search_client.get_document(key=parent_id, selected_fields=SIMILAR_RFP_FIELDS)
+                    for parent_id in parent_scores
+                ], return_exceptions=True)
+            similar_rfps = []
+            for document, score in zip(documents, parent_scores.values()):
+                if isinstance(document, ResourceNotFoundError):
+                    continue
+                if isinstance(document, Exception):
+                    raise document
+                similar_rfps.append(self._to_similar_rfp(document, score))
+            return similar_rfps
+        except Exception:
+            return []
+    
+    def _top_parents(self, results, limit: int) -> Dict[str, float]:
+        """점수 순 청크 결과에서 부모 문서별 최고 점수만 남겨 상위 limit개 (부모 id -> 점수, 점수 순)"""
+        parent_scores = {}
+        for result in results:
+            parent_scores.setdefault(result["parent_id"], result.get("@search.score", 0))
+            if len(parent_scores) >= limit:
+                break
+        return parent_scores
+    
+    def _to_similar_rfp(self, result, score: float = None) -> Dict[str, Any]:
+        """검색 결과 문서를 유사 RFP 항목으로 변환 (score가 없으면 검색 점수 사용)"""
+        return {
+            "title": result["title"],
+            "project_type": result["project_type"],
+            "requirements": result["requirements"],
+            "evaluation_criteria": result["evaluation_criteria"],
+            "created_date": result["created_date"],
+            "score": result.get("@search.score", 0) if score is None else score
+        }
+    
+    def _build_qa_messages(self, question: str, rfp_content: str, rfp_analysis: Dict[str, Any] = None) -> List[Dict[str, str]]:
+        """질의응답 프롬프트 메시지 구성"""
+        # RFP 분석 결과가 있으면 구조화된 정보도 포함
+        analysis_context = ""
+        if rfp_analysis:
+            analysis_context = f"""
+            
+            RFP 분석 결과:
+            {json.dumps(rfp_analysis, ensure_ascii=False, indent=2)}
+            """
+        
+        prompt = f"""
+        RFP 문서 내용을 바탕으로 질문에 답변해주세요.
+        
+        RFP 내용:
+        {_truncate_to_tokens(rfp_content, QA_CONTEXT_TOKENS, "gpt-4o-mini")}
+        
+        {analysis_context}
+        
+        사용자 질문: {question}
+        
+        답변 지침:
+        1. RFP 문서에서 직접 찾을 수 있는 정보를 우선 제공
+        2. 구체적인 수치, 조건, 일정 등 정확히 명시
+        3. 관련 조항이나 섹션 참조
+        4. 정보가 명확하지 않으면 "문서에서 명확한 정보를 찾을 수 없습니다" 표시
+        5. 한국어로 간결하게 답변
+        
+        답변:
+        """
+        
+        return [
+            {"role": "system", "content": "당신은 RFP 문서 분석 전문가입니다. RFP 문서의 내용을 정확하게 분석하여 사용자의 질문에 구체적이고 정확한 답변을 제공합니다."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def ask_question_about_rfp(self, question: str, rfp_content: str, rfp_analysis: Dict[str, Any] = None) -> str:
+        """RFP 내용에 대한 질의응답"""
+        try:
             response = self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "당신은 RFP 문서 분석 전문가입니다. RFP 문서의 내용을 정확하게 분석하여 사용자의 질문에 구체적이고 정확한 답변을 제공합니다."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._build_qa_messages(question, rfp_content, rfp_analysis),
                 temperature=0.3,
                 max_tokens=1000
             )
@@ -698,102 +1632,490 @@ class RFPAnalyzer:
             
         except Exception as e:
             st.error(f"❌ 질의응답 처리 오류: {str(e)}")
-            return "질문 처리 중 오류가 발생했습니다. 다시 시도해주세요."
-
-    # def generate_proposal_draft(self, rfp_analysis: Dict[str, Any], similar_rfps: List[Dict]) -> str:
-    #     """제안서 초안 생성"""
-    #     similar_rfps_text = ""
-    #     for i, rfp in enumerate(similar_rfps[:3], 1):
-    #         similar_rfps_text += f"\n{i}. {rfp['title']} (유형: {rfp['project_type']})\n"
-    #     
-    #     # RFP 분석 정보를 구조화된 형태로 정리
-    #     rfp_summary = ""
-    #     for category_key, category_data in rfp_analysis.items():
-    #         if category_key.startswith(('1_', '2_', '3_', '4_', '5_', '6_', '7_', '8_', '9_', '10_', '11_')):
-    #             category_name = category_key.replace('_', ' ').replace('1 ', '1. ').replace('2 ', '2. ').replace('3 ', '3. ').replace('4 ', '4. ').replace('5 ', '5. ').replace('6 ', '6. ').replace('7 ', '7. ').replace('8 ', '8. ').replace('9 ', '9. ').replace('10 ', '10. ').replace('11 ', '11. ')
-    #             rfp_summary += f"\n{category_name}:\n"
-    #             
-    #             # 요구사항의 경우 상세목록이 있으면 고유번호별로 표시
-    #             if category_key == "5_요구사항" and isinstance(category_data, dict) and "요구사항_상세목록" in category_data:
-    #                 requirements_list = category_data.get("요구사항_상세목록", [])
-    #                 if requirements_list:
-    #                     rfp_summary += "  요구사항 상세목록:\n"
-    #                     for req in requirements_list:
-    #                         rfp_summary += f"    - {req.get('요구사항_고유번호', 'N/A')}: {req.get('요구사항_명칭', 'N/A')}\n"
-    #                         rfp_summary += f"      분류: {req.get('요구사항_분류', 'N/A')}\n"
-    #                         rfp_summary += f"      세부내용: {req.get('요구사항_세부내용', 'N/A')}\n"
-    #                         if req.get('산출정보'):
-    #                             rfp_summary += f"      산출정보: {', '.join(req.get('산출정보', []))}\n"
-    #                         rfp_summary += "\n"
-    #             
-    #             if isinstance(category_data, dict):
-    #                 for key, value in category_data.items():
-    #                     if value and key != "요구사항_상세목록":
-    #                         rfp_summary += f"  - {key}: {value}\n"
-    #             else:
-    #                 rfp_summary += f"  {category_data}\n"
-    #     
-    #     prompt = f"""
-    #     다음 RFP 분석 결과를 바탕으로 전문적인 제안서 초안을 작성해주세요:
-
-    #     RFP 분석 결과:
-    #     {rfp_summary}
-
-    #     기술 솔루션 매핑: {json.dumps(rfp_analysis.get('기술솔루션매핑', {}), ensure_ascii=False)}
-
-    #     유사 프로젝트 사례:{similar_rfps_text}
-
-    #     **제안서 작성 지침:**
-    #     - 요구사항 고유번호(예: ECR-HWR-SVR-02, REQ-XXX-XXX 등)를 명시하여 각 요구사항에 대한 구체적인 솔루션을 제시하세요
-    #     - 각 요구사항별로 어떻게 해결할 것인지 명확하게 설명하세요
-    #     - 요구사항 고유번호와 함께 산출물도 언급하세요 (예: ECR-HWR-SVR-02 요구사항에 대한 아키텍처 설계서 제출)
-
-    #     다음 구조로 제안서 초안을 작성해주세요:
-
-    #     **Ⅰ. 제안 개요**
-    #     - 사업이해도
-
-    #     **Ⅱ. 제안 업체 일반 (KT DS)**
-    #     1. 일반 현황
-    #     2. 조직 및 인원
-    #     3. 주요 사업 내용
-    #     4. 주요 사업 실적
-
-    #     **Ⅲ. 프로젝트 수행 부문**
-    #     1. 추진 전략 및 개발 방법론
-    #     2. 시스템 구성도
-    #     3. 시스템 구축
-    #         > 3.1 개발대상업무 내역 및 구성요건
-    #         > 3.2 연계 범위
-    #         > 3.3 표준화 요건
-    #         > 3.4 보안 및 웹 표준화, 성능시험 요구사항
-    #         > 3.5 테스트 수행 방안
-
-    #     **Ⅳ. 프로젝트 관리 부문**
-    #     1. 프로젝트 관리 방법론
-    #     2. 추진 일정 계획
-    #     3. 투입 인력 및 이력 사항
-
-    #     **Ⅴ. 지원 부문**
-    #     1. 교육 훈련 계획
-    #     2. 기술지원 계획
-    #     3. 하자보수 계획
-    #     4. 안정화
-    #     """
-    #     
-    #     try:
-    #         response = self.openai_client.chat.completions.create(
-    #             model="gpt-4o-mini",
-    #             messages=[
-    #                 {"role": "system", "content": "당신은 경험이 풍부한 제안서 작성 전문가입니다. 기술적으로 정확하고 설득력 있는 제안서를 작성합니다."},
-    #                 {"role": "user", "content": prompt}
-    #             ],
-    #             temperature=0.5,
-    #             max_tokens=3000
-    #         )
-    #         
-    #         return response.choices[0].message.content
-    #         
-    #     except Exception as e:
-    #         st.error(f"❌ 제안서 초안 생성 오류: {str(e)}")
-    #         return ""
+            return QA_ERROR_ANSWER
+    
+    def ask_question_about_rfp_stream(self, question: str, rfp_content: str, rfp_analysis: Dict[str, Any] = None):
+        """RFP 내용에 대한 질의응답 (스트리밍, 생성되는 토큰을 순서대로 yield)"""
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=self._build_qa_messages(question, rfp_content, rfp_analysis),
+                temperature=0.3,
+                max_tokens=1000,
+                stream=True
+            )
+            
+            for chunk in stream:
+                # Azure는 콘텐츠 필터 결과만 담긴 빈 choices 청크를 보내기도 함
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            
+        except Exception as e:
+            st.error(f"❌ 질의응답 처리 오류: {str(e)}")
+            yield QA_ERROR_ANSWER
+
+    def _build_rfp_summary(self, rfp_analysis: Dict[str, Any]) -> str:
+        """RFP 분석 정보를 구조화된 텍스트로 정리 (같은 분석 결과는 캐시에서 재사용)"""
+        key = hashlib.sha256(_dumps_sorted(rfp_analysis).encode("utf-8")).hexdigest()
+        with self._summary_cache_lock:
+            rfp_summary = self._summary_cache.get(key)
+            if rfp_summary is not None:
+                self._summary_cache.move_to_end(key)
+                return rfp_summary
+        
+        rfp_summary = self._format_rfp_summary(rfp_analysis)
+        with self._summary_cache_lock:
+            self._summary_cache[key] = rfp_summary
+            if len(self._summary_cache) > SUMMARY_CACHE_SIZE:
+                self._summary_cache.popitem(last=False)
+        return rfp_summary
+    
+    def _format_rfp_summary(self, rfp_analysis: Dict[str, Any]) -> str:
+        """RFP 분석 정보를 구조화된 텍스트로 변환 (조각을 리스트에 모았다가 한 번만 합침)"""
+        parts = []
+        for category_key, category_data in rfp_analysis.items():
+            # 내용이 없는 카테고리는 제목도 넣지 않아 프롬프트 토큰 절약
+            if not _has_content(category_data):
+                continue
+            if category_key.startswith(('1_', '2_', '3_', '4_', '5_', '6_', '7_', '8_', '9_', '10_', '11_')):
+                category_name = category_key.replace('_', ' ').replace('1 ', '1. ').replace('2 ', '2. ').replace('3 ', '3. ').replace('4 ', '4. ').replace('5 ', '5. ').replace('6 ', '6. ').replace('7 ', '7. ').replace('8 ', '8. ').replace('9 ', '9. ').replace('10 ', '10. ').replace('11 ', '11. ')
+                parts.append(f"\n{category_name}:\n")
+                
+                # 요구사항의 경우 상세목록이 있으면 고유번호별로 표시
+                if category_key == "5_요구사항" and isinstance(category_data, dict) and "요구사항_상세목록" in category_data:
+                    requirements_list = category_data.get("요구사항_상세목록", [])
+                    if requirements_list:
+                        parts.append("  요구사항 상세목록:\n")
+                        for req in requirements_list:
+                            parts.append(f"    - {req.get('요구사항_고유번호', 'N/A')}: {req.get('요구사항_명칭', 'N/A')}\n")
+                            parts.append(f"      분류: {req.get('요구사항_분류', 'N/A')}\n")
+                            parts.append(f"      세부내용: {req.get('요구사항_세부내용', 'N/A')}\n")
+                            if req.get('산출정보'):
+                                parts.append(f"      산출정보: {', '.join(req.get('산출정보', []))}\n")
+                            parts.append("\n")
+                
+                if isinstance(category_data, dict):
+                    for key, value in category_data.items():
+                        if value and key != "요구사항_상세목록":
+                            parts.append(f"  - {key}: {value}\n")
+                else:
+                    parts.append(f"  {category_data}\n")
+        
+        return "".join(parts)
+    
+    def _build_proposal_section_messages(self, rfp_summary: str, tech_mapping_json: str,
+                                         similar_rfps_text: str, section_title: str, section_outline: str) -> List[Dict[str, str]]:
+        """제안서 섹션 하나를 작성하는 프롬프트 메시지 구성
+        
+        고정 지침(PROPOSAL_SYSTEM_PROMPT) → RFP별 정보 → 섹션 지시 순으로 배치해,
+        같은 RFP의 섹션 요청끼리 앞부분이 바이트 단위로 같아 프롬프트 캐시가 적용되도록 합니다.
+        """
+        prompt = _PROPOSAL_SECTION_TEMPLATE.render(
+            rfp_summary=rfp_summary,
+            tech_mapping=tech_mapping_json,
+            similar_rfps_text=similar_rfps_text,
+            section_title=section_title,
+            section_outline=section_outline
+        )
+        
+        return [
+            {"role": "system", "content": PROPOSAL_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _build_requirement_solution_messages(self, tech_mapping_json: str, requirements: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """요구사항 묶음의 대응 방안을 JSON으로 요청하는 프롬프트 메시지 구성"""
+        lines = []
+        for req in requirements:
+            lines.append(f"- {req.get('요구사항_고유번호')}: {req.get('요구사항_명칭', 'N/A')} (분류: {req.get('요구사항_분류', 'N/A')})")
+            lines.append(f"  세부내용: {req.get('요구사항_세부내용', 'N/A')}")
+            if req.get('산출정보'):
+                lines.append(f"  산출정보: {', '.join(req.get('산출정보', []))}")
+        
+        prompt = f"기술 솔루션 매핑: {tech_mapping_json}\n\n요구사항 목록:\n" + "\n".join(lines)
+        
+        return [
+            {"role": "system", "content": REQUIREMENT_SOLUTION_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _draft_cache_key(self, request) -> str:
+        """제안서 섹션 캐시 키 (정렬된 JSON으로 직렬화한 프롬프트·요청 파라미터의 sha256)"""
+        return hashlib.sha256(json.dumps(request, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def _get_cached_section(self, key: str):
+        """캐시된 제안서 섹션 조회 (없으면 None)"""
+        with self._draft_cache_lock:
+            section = self._draft_cache.get(key)
+            if section is not None:
+                self._draft_cache.move_to_end(key)
+            return section
+    
+    def _cache_section(self, key: str, section: str):
+        """제안서 섹션 저장 (오래된 항목부터 제거)"""
+        with self._draft_cache_lock:
+            self._draft_cache[key] = section
+            self._draft_cache.move_to_end(key)
+            if len(self._draft_cache) > DRAFT_CACHE_SIZE:
+                self._draft_cache.popitem(last=False)
+    
+    def _proposal_completion_body(self, messages: List[Dict[str, str]], max_tokens: int, model: str) -> Dict[str, Any]:
+        """제안서 섹션 생성 요청 파라미터 (대화형 호출과 Batch API 요청 본문에 공통으로 사용)"""
+        return {
+            "model": os.getenv("FORCE_MODEL") or model,
+            "messages": messages,
+            "temperature": 0.5,
+            "max_tokens": max_tokens,
+            "response_format": PROPOSAL_RESPONSE_FORMAT
+        }
+    
+    def _proposal_semaphore(self) -> asyncio.Semaphore:
+        """제안서 요청 동시 실행 수 제한 (이벤트 루프마다 새로 생성해야 하므로 호출 시점에 만듦)"""
+        return asyncio.Semaphore(int(os.getenv("OPENAI_CONCURRENCY", PROPOSAL_CONCURRENCY)))
+    
+    @_openai_retry
+    async def _create_chat_completion(self, client, **kwargs):
+        """채팅 완성 요청 (요청 한도 초과·타임아웃 시 지수 백오프로 재시도)"""
+        return await client.chat.completions.create(**kwargs)
+    
+    def _render_proposal_section(self, section_title: str, content: str) -> str:
+        """구조화된 출력(JSON)으로 받은 섹션을 검증해 제안서 형식으로 변환"""
+        section = ProposalSection.model_validate_json(content)
+        return _PROPOSAL_SECTION_MARKDOWN.render(title=section_title, section=section)
+    
+    async def _generate_proposal_section(self, client, semaphore: asyncio.Semaphore, body: Dict[str, Any],
+                                         section_title: str, usage: Dict[str, int]) -> str:
+        """제안서 섹션 하나 생성 (동시 요청 수는 semaphore로 제한, 토큰 사용량은 usage에 누적)
+        
+        응답이 최대 출력 토큰 수에 걸려 잘리면 JSON이 깨지므로 최대 출력 토큰 수를
+        PROPOSAL_TRUNCATION_RETRY_FACTOR배로 늘려 한 번 더 요청하고, 그래도 잘리면 오류를 발생시킵니다.
+        """
+        key = self._draft_cache_key(body)
+        section = self._get_cached_section(key)
+        if section is not None:
+            return section
+        
+        async with semaphore:
+            response = await self._create_chat_completion(client, **body)
+            self._record_draft_usage(usage, response.usage)
+            if response.choices[0].finish_reason == "length":
+                response = await self._create_chat_completion(
+                    client, **{**body, "max_tokens": body["max_tokens"] * PROPOSAL_TRUNCATION_RETRY_FACTOR}
+                )
+                self._record_draft_usage(usage, response.usage)
+        if response.choices[0].finish_reason == "length":
+            raise ValueError("응답이 최대 출력 토큰 수에 걸려 잘렸습니다.")
+        section = self._render_proposal_section(section_title, response.choices[0].message.content or "")
+        self._cache_section(key, section)
+        return section
+    
+    async def _generate_requirement_solutions(self, client, semaphore: asyncio.Semaphore,
+                                              messages: List[Dict[str, str]], usage: Dict[str, int]) -> Dict[str, str]:
+        """요구사항 묶음의 대응 방안 생성 (요구사항 고유번호 -> 해결 방안)"""
+        key = self._draft_cache_key(messages)
+        content = self._get_cached_section(key)
+        if content is None:
+            async with semaphore:
+                response = await self._create_chat_completion(
+                    client,
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=REQUIREMENT_SOLUTION_TOKENS * REQUIREMENT_BATCH_SIZE,
+                    response_format={"type": "json_object"}
+                )
+            self._record_draft_usage(usage, response.usage)
+            # 최대 토큰 수에 걸려 잘린 JSON은 파싱할 수 없으므로 원인을 알 수 있는 오류로 처리
+            if response.choices[0].finish_reason == "length":
+                raise ValueError("응답이 최대 출력 토큰 수에 걸려 잘렸습니다.")
+            content = response.choices[0].message.content or "{}"
+        
+        solutions = {
+            str(item.get("id")): item.get("solution", "")
+            for item in json.loads(content).get("solutions", [])
+            if isinstance(item, dict) and item.get("id")
+        }
+        # 파싱에 성공한 응답만 캐시
+        if solutions:
+            self._cache_section(key, content)
+        return solutions
+    
+    def _render_requirement_solutions(self, requirement_requests, results, warnings: List[str]) -> str:
+        """요구사항별 대응 방안을 요구사항 순서대로 제안서 형식으로 변환
+        
+        생성하지 못한 요구사항도 초안에서 빠지지 않도록 실패 표시와 함께 남기고, 원인은 warnings에 추가합니다
+        (백그라운드 스레드에서는 st.warning이 화면에 표시되지 않으므로 호출자가 화면 스레드에서 표시).
+        """
+        lines = []
+        for (requirements, _), solutions in zip(requirement_requests, results):
+            failed = isinstance(solutions, Exception)
+            if failed:
+                ids = ", ".join(str(req.get('요구사항_고유번호')) for req in requirements)
+                warnings.append(f"요구사항 {ids} 대응 방안 생성 오류: {str(solutions)}")
+                solutions = {}
+            
+            missing = []
+            for req in requirements:
+                req_id = str(req.get('요구사항_고유번호'))
+                solution = solutions.get(req_id)
+                if not solution:
+                    missing.append(req_id)
+                    solution = "(대응 방안 생성에 실패했습니다. 다시 시도해주세요.)"
+                lines.append(f"- **{req_id}** {req.get('요구사항_명칭', '')}: {solution}")
+            if missing and not failed:
+                warnings.append(f"요구사항 {', '.join(missing)} 대응 방안이 응답에 없습니다.")
+        
+        if not lines:
+            return ""
+        return "**요구사항별 대응 방안**\n\n" + "\n".join(lines)
+    
+    def _new_draft_usage(self, usage: Dict[str, int] = None) -> Dict[str, int]:
+        """제안서 생성 한 번의 토큰 사용량 집계용 딕셔너리 (호출자가 준 딕셔너리는 0으로 초기화해 그대로 사용)
+        
+        analyzer는 모든 세션이 공유하므로 사용량을 인스턴스에 두지 않고 호출마다 따로 집계합니다.
+        """
+        if usage is None:
+            usage = {}
+        usage.update(prompt_tokens=0, cached_tokens=0, completion_tokens=0)
+        return usage
+    
+    def _record_draft_usage(self, totals: Dict[str, int], usage):
+        """제안서 생성 토큰 사용량을 totals에 누적 (cached_tokens: 프롬프트 캐시에서 처리된 입력 토큰 수)"""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        totals["prompt_tokens"] += usage.prompt_tokens or 0
+        totals["cached_tokens"] += (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        totals["completion_tokens"] += usage.completion_tokens or 0
+    
+    def _build_proposal_requests(self, rfp_analysis: Dict[str, Any], similar_rfps: List[Dict]):
+        """제안서 초안 생성 요청 목록 (섹션 공통 정보는 한 번만 생성)
+        
+        Returns:
+            (섹션별 요청 파라미터 목록 (PROPOSAL_SECTIONS 순서),
+             요구사항 묶음별 (요구사항 목록, 프롬프트 메시지) 목록)
+        """
+        similar_rfps_text = "".join(
+            f"\n{i}. {rfp['title']} (유형: {rfp['project_type']})\n" for i, rfp in enumerate(similar_rfps[:3], 1)
+        )
+        
+        rfp_summary = self._build_rfp_summary(rfp_analysis)
+        
+        # 모든 섹션이 같은 직렬화 결과를 쓰도록 한 번만 변환 (키 정렬로 바이트를 고정해 프롬프트 캐시 유지)
+        tech_mapping_json = _dumps_sorted(rfp_analysis.get('기술솔루션매핑', {}))
+        
+        section_bodies = [
+            self._proposal_completion_body(
+                self._build_proposal_section_messages(rfp_summary, tech_mapping_json, similar_rfps_text, title, outline),
+                max_tokens,
+                model
+            )
+            for title, outline, max_tokens, model in PROPOSAL_SECTIONS
+        ]
+        
+        # 고유번호가 있는 요구사항을 REQUIREMENT_BATCH_SIZE개씩 묶어 한 요청으로 처리
+        requirements_category = rfp_analysis.get("5_요구사항")
+        requirements = []
+        if isinstance(requirements_category, dict):
+            requirements = [
+                req for req in requirements_category.get("요구사항_상세목록", [])
+                if isinstance(req, dict) and req.get("요구사항_고유번호")
+            ]
+        requirement_requests = []
+        for i in range(0, len(requirements), REQUIREMENT_BATCH_SIZE):
+            batch = requirements[i:i + REQUIREMENT_BATCH_SIZE]
+            requirement_requests.append((batch, self._build_requirement_solution_messages(tech_mapping_json, batch)))
+        
+        return section_bodies, requirement_requests
+    
+    async def generate_proposal_draft_async(self, rfp_analysis: Dict[str, Any], similar_rfps: List[Dict],
+                                            usage: Dict[str, int] = None, warnings: List[str] = None) -> str:
+        """제안서 초안 생성 (비동기, Ⅰ~Ⅴ 섹션을 동시에 생성해 순서대로 합침)
+        
+        usage에 딕셔너리를 주면 이번 생성의 토큰 사용량(prompt_tokens, cached_tokens, completion_tokens)을 기록합니다.
+        warnings에 리스트를 주면 일부 섹션·요구사항 생성 실패 사유를 st.warning 대신 리스트에 추가합니다
+        (백그라운드 스레드에서 호출할 때 사용).
+        """
+        usage = self._new_draft_usage(usage)
+        report_warnings = warnings is None
+        if report_warnings:
+            warnings = []
+        
+        try:
+            section_bodies, requirement_requests = self._build_proposal_requests(rfp_analysis, similar_rfps)
+            semaphore = self._proposal_semaphore()
+            async with self._async_openai_client() as client:
+                results = await asyncio.gather(*[
+                    self._generate_proposal_section(client, semaphore, body, title, usage)
+                    for body, (title, *_) in zip(section_bodies, PROPOSAL_SECTIONS)
+                ], *[
+                    self._generate_requirement_solutions(client, semaphore, messages, usage)
+                    for _, messages in requirement_requests
+                ], return_exceptions=True)
+            sections = results[:len(section_bodies)]
+            
+            # 실패한 섹션은 안내 문구로 대신하고, 모두 실패하면 빈 문자열 반환
+            draft_sections = []
+            for (title, *_), section in zip(PROPOSAL_SECTIONS, sections):
+                if isinstance(section, Exception):
+                    warnings.append(f"'{title}' 섹션 생성 오류: {str(section)}")
+                    draft_sections.append(f"**{title}**\n\n(섹션 생성에 실패했습니다. 다시 시도해주세요.)")
+                else:
+                    draft_sections.append(section.strip())
+            
+            if all(isinstance(section, Exception) for section in sections):
+                return ""
+            
+            requirement_solutions = self._render_requirement_solutions(
+                requirement_requests, results[len(section_bodies):], warnings
+            )
+            if requirement_solutions:
+                draft_sections.insert(REQUIREMENT_SECTION_INDEX + 1, requirement_solutions)
+            return "\n\n".join(draft_sections)
+            
+        except Exception as e:
+            st.error(f"❌ 제안서 초안 생성 오류: {str(e)}")
+            return ""
+        finally:
+            if report_warnings:
+                for message in warnings:
+                    st.warning(f"⚠️ {message}")
+    
+    def generate_proposal_draft(self, rfp_analysis: Dict[str, Any], similar_rfps: List[Dict],
+                                usage: Dict[str, int] = None, warnings: List[str] = None) -> str:
+        """제안서 초안 생성 (usage, warnings: generate_proposal_draft_async 참고)"""
+        return asyncio.run(self.generate_proposal_draft_async(rfp_analysis, similar_rfps, usage, warnings))
+    
+    def generate_proposal_drafts_batch(self, rfp_list: List[Tuple[Dict[str, Any], List[Dict]]]) -> List[str]:
+        """여러 RFP의 제안서 초안을 Batch API로 한꺼번에 생성 (야간 일괄 처리용, 입력 순서대로 초안 반환)
+        
+        rfp_list: (RFP 분석 결과, 유사 RFP 목록) 튜플의 리스트.
+        Batch API는 비용이 절반이지만 최대 24시간이 걸리므로 대화형 화면에서는 generate_proposal_draft를 사용합니다.
+        """
+        try:
+            # 캐시에 없는 섹션만 모아서 한 번의 배치 작업으로 제출
+            drafts = []
+            pending = []  # (초안 위치, 섹션 위치, 캐시 키)
+            bodies = []
+            for i, (rfp_analysis, similar_rfps) in enumerate(rfp_list):
+                sections = []
+                section_bodies, _ = self._build_proposal_requests(rfp_analysis, similar_rfps)
+                for j, body in enumerate(section_bodies):
+                    key = self._draft_cache_key(body)
+                    section = self._get_cached_section(key)
+                    if section is None:
+                        pending.append((i, j, key))
+                        bodies.append(body)
+                    sections.append(section)
+                drafts.append(sections)
+            
+            if bodies:
+                responses = self._run_batch_job("/v1/chat/completions", bodies, PROPOSAL_BATCH_POLL_TIMEOUT)
+                
+                # 요청별로 처리해 실패한 섹션만 안내 문구로 대신함
+                for (i, j, key), body in zip(pending, responses):
+                    title = PROPOSAL_SECTIONS[j][0]
+                    try:
+                        if isinstance(body, Exception):
+                            raise body
+                        choice = body["choices"][0]
+                        if choice.get("finish_reason") == "length":
+                            raise ValueError("응답이 최대 출력 토큰 수에 걸려 잘렸습니다.")
+                        section = self._render_proposal_section(title, choice["message"]["content"] or "")
+                        self._cache_section(key, section)
+                    except Exception as e:
+                        section = f"**{title}**\n\n(섹션 생성에 실패했습니다: {str(e)})"
+                    drafts[i][j] = section
+            
+            return ["\n\n".join(section.strip() for section in sections) for sections in drafts]
+            
+        except Exception as e:
+            st.error(f"❌ 제안서 초안 일괄 생성 오류: {str(e)}")
+            return []
+    
+    async def _stream_proposal_section(self, client, semaphore: asyncio.Semaphore, body: Dict[str, Any],
+                                       section_queue: queue.Queue, section_title: str, usage: Dict[str, int],
+                                       warnings: List[str]):
+        """제안서 섹션 하나를 생성해 완성되는 대로 section_queue에 넣음 (끝나면 None)
+        
+        구조화된 출력(JSON)은 완성되어야 검증·렌더링할 수 있으므로 섹션 단위로 내보냅니다.
+        """
+        try:
+            section_queue.put(await self._generate_proposal_section(client, semaphore, body, section_title, usage))
+        except Exception as e:
+            warnings.append(f"'{section_title}' 섹션 생성 오류: {str(e)}")
+            section_queue.put(f"**{section_title}**\n\n(섹션 생성에 실패했습니다: {str(e)})")
+        finally:
+            section_queue.put(None)
+    
+    async def _stream_requirement_solutions(self, client, semaphore: asyncio.Semaphore, requirement_requests,
+                                            section_queue: queue.Queue, usage: Dict[str, int], warnings: List[str]):
+        """요구사항별 대응 방안을 모두 생성한 뒤 한 번에 section_queue에 넣음 (끝나면 None)"""
+        try:
+            results = await asyncio.gather(*[
+                self._generate_requirement_solutions(client, semaphore, messages, usage)
+                for _, messages in requirement_requests
+            ], return_exceptions=True)
+            requirement_solutions = self._render_requirement_solutions(requirement_requests, results, warnings)
+            if requirement_solutions:
+                section_queue.put(requirement_solutions)
+        finally:
+            section_queue.put(None)
+    
+    async def _stream_proposal_sections(self, rfp_analysis: Dict[str, Any], similar_rfps: List[Dict],
+                                        section_queues: List[queue.Queue], requirement_queue: queue.Queue,
+                                        usage: Dict[str, int], warnings: List[str]):
+        """모든 섹션과 요구사항별 대응 방안을 동시에 스트리밍 생성 (섹션별 큐에 기록)"""
+        try:
+            section_bodies, requirement_requests = self._build_proposal_requests(rfp_analysis, similar_rfps)
+            semaphore = self._proposal_semaphore()
+            async with self._async_openai_client() as client:
+                await asyncio.gather(*[
+                    self._stream_proposal_section(client, semaphore, body, section_queue, title, usage, warnings)
+                    for body, section_queue, (title, *_) in zip(section_bodies, section_queues, PROPOSAL_SECTIONS)
+                ], self._stream_requirement_solutions(
+                    client, semaphore, requirement_requests, requirement_queue, usage, warnings
+                ))
+        except Exception as e:
+            # 섹션 생성을 시작하기 전에 실패한 경우 (소비자가 멈추지 않도록 모든 큐를 닫음)
+            for section_queue in section_queues:
+                section_queue.put(f"(제안서 초안 생성 오류: {str(e)})")
+                section_queue.put(None)
+            requirement_queue.put(None)
+    
+    def generate_proposal_draft_stream(self, rfp_analysis: Dict[str, Any], similar_rfps: List[Dict],
+                                       usage: Dict[str, int] = None, warnings: List[str] = None):
+        """제안서 초안을 섹션 순서대로 스트리밍 (st.write_stream 용 제너레이터)
+        
+        섹션은 백그라운드 스레드의 이벤트 루프에서 동시에 생성되고, 앞 섹션이 끝날 때까지
+        먼저 완성된 뒤 섹션은 섹션별 큐에 쌓여 있다가 순서대로 내보내집니다.
+        usage에 딕셔너리를 주면 이번 생성의 토큰 사용량을 기록합니다 (제너레이터가 끝나면 확정).
+        warnings에 리스트를 주면 일부 섹션·요구사항 생성 실패 사유를 추가합니다 (화면 스레드에서 표시하는 용도).
+        """
+        usage = self._new_draft_usage(usage)
+        if warnings is None:
+            warnings = []
+        section_queues = [queue.Queue() for _ in PROPOSAL_SECTIONS]
+        requirement_queue = queue.Queue()
+        threading.Thread(
+            target=asyncio.run,
+            args=(self._stream_proposal_sections(
+                rfp_analysis, similar_rfps, section_queues, requirement_queue, usage, warnings
+            ),),
+            daemon=True
+        ).start()
+        
+        # 요구사항별 대응 방안은 REQUIREMENT_SECTION_INDEX 섹션 바로 뒤에 내보냄 (내용이 없으면 생략)
+        ordered_queues = list(section_queues)
+        ordered_queues.insert(REQUIREMENT_SECTION_INDEX + 1, requirement_queue)
+        started = False
+        for section_queue in ordered_queues:
+            delta = section_queue.get()
+            if delta is None:
+                continue
+            if started:
+                yield "\n\n"
+            started = True
+            while delta is not None:
+                yield delta
+                delta = section_queue.get()